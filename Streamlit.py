@@ -1,30 +1,67 @@
 import os
+import json
 from functools import lru_cache
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import requests
 
+from drilldown import DRILL_SOURCES, TOP_N, DrillIndex, district_key, drill_version, load_state
+from geo import DEFAULT_DETAIL, geo_version, load_geojson, pack_coordinates
+from backends import DEFAULT_BACKEND, get_backend
+from growth import GrowthMatrix, district_metrics, load_district_metric
+import profiling
+from profiling import span
+from rollup import METRICS, cube_version
+from slices import CategorySliceIndex, SliceIndex
+from snapshots import load_snapshot, snapshot_version
+from states import STATE_NAMES, reconcile
+
 # -----------------------------
-# USER CONFIG - update paths if needed
+# USER CONFIG - set PULSE_DATA_DIR to read the datasets from another folder
 # -----------------------------
-CSV_PATHS = {
-    "agg_trans": r"C:\Users\USER\OneDrive\Desktop\Avg_trans.csv",
-    "agg_user": r"C:\Users\USER\OneDrive\Desktop\Avg_user.csv",
-    "agg_ins": r"C:\Users\USER\OneDrive\Desktop\Avg_Insurance.csv",
-    "map_trans": r"C:\Users\USER\OneDrive\Desktop\Map_trans.csv",
-    "map_user": r"C:\Users\USER\OneDrive\Desktop\Map_user.csv",
-    "map_ins": r"C:\Users\USER\OneDrive\Desktop\Map_Insurance.csv",
-    "top_tx_dist": r"C:\Users\USER\OneDrive\Desktop\Top_Transaction_District.csv",
-    "top_tx_pin": r"C:\Users\USER\OneDrive\Desktop\Top_Transaction_Pincode.csv",
-    "top_user_dist": r"C:\Users\USER\OneDrive\Desktop\Top_user_District.csv",
-    "top_user_pin": r"C:\Users\USER\OneDrive\Desktop\Top_user_Pincode.csv",
-    "top_ins_dist": r"C:\Users\USER\OneDrive\Desktop\Top_insurance_District.csv",
-    "top_ins_pin": r"C:\Users\USER\OneDrive\Desktop\Top_insurance_Pincode.csv",
+# What each page needs, loaded only when the page is opened. "datasets" lists
+# the raw tables and columns the page's aggregate queries (backends.py, in
+# "queries") read; its year slider comes from those tables' Year column.
+# "geo" pages draw the India map and read the rollup cubes (rollup.py), which
+# span every dataset; Scenario 5 reads the state cube or one Map_* table.
+# Run `python storage.py` once to create the typed Parquet copies (CSV is the fallback).
+PAGES = {
+    "Home (Transactions / Users / Insurance)": {"datasets": {}, "queries": [], "geo": True},
+    "Scenario 1: Top States by Transactions (Key1)": {
+        "datasets": {"agg_trans": ["Year", "State", "Transaction_amount"]},
+        "queries": ["top_states"]},
+    "Scenario 2: Yearly Transaction Growth (Key2)": {
+        "datasets": {"agg_trans": ["Year", "Transaction_amount"]},
+        "queries": ["yearly_growth"]},
+    "Scenario 3: Insurance Penetration (Key3)": {
+        "datasets": {"agg_trans": ["Year", "State", "Transaction_amount"],
+                     "agg_ins": ["Year", "State", "Insurance_amount"]},
+        "queries": ["insurance_penetration"]},
+    "Scenario 4: User Engagement by Brand (Key4)": {
+        "datasets": {"agg_user": ["Year", "State", "Brand", "Brand_count"],
+                     "map_user": ["Year", "State", "App_opens"]},
+        "queries": ["brand_users", "engagement"]},
+    "Scenario 5: Growth Trends by State / District (Key5)": {"datasets": {}, "queries": []},
 }
 
-GEOJSON_URL = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+# Query backend: pandas (in-process), postgres (tables from db_load.py, PULSE_PG_DSN)
+# or duckdb (embedded, over the Parquet/CSV files). Set PULSE_BACKEND to switch.
+# The Home drill-down (drilldown.py) and the district growth matrices (growth.py)
+# always read the local datasets, so they need PULSE_DATA_DIR with every backend.
+BACKEND = DEFAULT_BACKEND
+
+# Scenario pages are served from the precomputed snapshots (`python snapshots.py`)
+# when they match the current data; PULSE_SNAPSHOTS=0 always queries the backend.
+# Snapshots are built from the local files, so the postgres backend never uses them.
+SNAPSHOTS = os.environ.get("PULSE_SNAPSHOTS", "1") != "0"
+SNAPSHOT_BACKENDS = ("pandas", "duckdb")
+
+# Map boundaries come from the simplified assets in geo/ (run `python geo.py`);
+# PULSE_MAP_DETAIL picks the level: high / medium / low
+MAP_DETAIL = os.environ.get("PULSE_MAP_DETAIL", DEFAULT_DETAIL)
 
 # -----------------------------
 # Streamlit page config
@@ -35,240 +72,175 @@ st.title("📊 PhonePe Data Visualisation — Master Map ")
 # -----------------------------
 # Helpers: load, normalize, aggregate
 # -----------------------------
-@st.cache_data
-def load_geojson(url: str):
-    r = requests.get(url)
-    r.raise_for_status()
-    return r.json()
-
-def normalize_state_col(df, col='state'):
-    """Normalize state names using the mapping you provided."""
-    if col not in df.columns:
-        return df
-    s = df[col].astype(str).str.strip().str.lower()
-
-    mapping = {
-        'maharashtra': 'Maharashtra',
-        'uttar-pradesh': 'Uttar Pradesh',
-        'karnataka': 'Karnataka',
-        'rajasthan': 'Rajasthan',
-        'west-bengal': 'West Bengal',
-        'tamil-nadu': 'Tamil Nadu',
-        'bihar': 'Bihar',
-        'madhya-pradesh': 'Madhya Pradesh',
-        'telangana': 'Telangana',
-        'andhra-pradesh': 'Andhra Pradesh',
-        'kerala': 'Kerala',
-        'gujarat': 'Gujarat',
-        'haryana': 'Haryana',
-        'assam': 'Assam',
-        'jharkhand': 'Jharkhand',
-        'odisha': 'Odisha',
-        'himachal-pradesh': 'Himachal Pradesh',
-        'chandigarh': 'Chandigarh',
-        'tripura': 'Tripura',
-        'jammu-and-kashmir': 'Jammu & Kashmir',
-        'jammu-&-kashmir': 'Jammu & Kashmir',
-        'punjab': 'Punjab',
-        'sikkim': 'Sikkim',
-        'uttarakhand': 'Uttarakhand',
-        'nagaland': 'Nagaland',
-        'meghalaya': 'Meghalaya',
-        'mizoram': 'Mizoram',
-        'arunachal-pradesh': 'Arunachal Pradesh',
-        'manipur': 'Manipur',
-        'dadra-and-nagar-haveli-and-daman-and-diu': 'Dadra and Nagar Haveli and Daman and Diu',
-        'dadra-&-nagar-haveli-&-daman-&-diu': 'Dadra and Nagar Haveli and Daman and Diu',
-        'delhi': 'Delhi',
-        'andaman-and-nicobar-islands': 'Andaman & Nicobar',
-        'andaman-&-nicobar-islands': 'Andaman & Nicobar',
-        'ladakh': 'Ladakh',
-        'puducherry': 'Puducherry',
-        'goa': 'Goa',
-        'chhattisgarh': 'Chhattisgarh',
-        'lakshadweep': 'Lakshadweep'
-    }
-
-    # Normalize common separators
-    s = s.str.replace('&', 'and', regex=False)
-    s = s.str.replace('-', ' ', regex=False)
-    s = s.str.replace('  ', ' ', regex=False).str.strip()
-
-    normalized = []
-    for val in s:
-        if val in mapping:
-            normalized.append(mapping[val])
-        else:
-            normalized.append(val.title())
-    df[col] = normalized
-    return df
-
-@st.cache_data
-def load_all_csvs(paths: dict):
-    """Load all CSVs; return dict of dataframes. Missing CSV -> empty DataFrame."""
-    dfs = {}
-    for k, p in paths.items():
-        if not os.path.exists(p):
-            dfs[k] = pd.DataFrame()
-            continue
-        df = pd.read_csv(p)
-        df.columns = df.columns.str.strip().str.lower()
-        if 'state' in df.columns:
-            df = normalize_state_col(df, 'state')
-        dfs[k] = df
-    return dfs
-
-def sum_if_present(df, candidates, newname):
-    """If any of the candidate columns exists in df, group by state sum it and rename to newname."""
-    col = next((c for c in candidates if c in df.columns), None)
-    if col:
-        s = df.groupby('state', as_index=False)[col].sum().rename(columns={col:newname})
-        return s
+@profiling.cache(st.cache_resource)
+def get_geojson(geo_key: str, detail: str):
+    """
+    Simplified state boundaries (geo.py), one copy shared by all sessions.
+    Raises when the asset is missing and cannot be fetched; st.cache_resource does not
+    cache exceptions, so the next run tries again.
+    """
+    return pack_coordinates(load_geojson("states", detail))
+
+@profiling.cache(st.cache_resource)
+def get_district_geojson(geo_key: str, detail: str, state: str):
+    """One state's district boundaries (None if it has none), shared by all sessions; raises if the asset was not built."""
+    districts = load_geojson("districts", detail, fetch=False)
+    features = [f for f in districts["features"] if f["properties"]["ST_NM"] == state]
+    if not features:
+        return None
+    return pack_coordinates({"type": "FeatureCollection", "features": features})
+
+@profiling.cache(st.cache_resource)
+def choropleth_template(geo_key: str, detail: str, state: str = None):
+    """
+    Base choropleth (boundaries, geos and layout), built once; see render_choropleth.
+    With a state, the map shows that state's districts.
+    """
+    if state is None:
+        geojson, key = get_geojson(geo_key, detail), "ST_NM"
     else:
-        return pd.DataFrame(columns=['state', newname])
+        geojson, key = get_district_geojson(geo_key, detail, state), "district"
+    fig = go.Figure(go.Choropleth(
+        geojson=geojson,
+        featureidkey=f"properties.{key}",
+        colorscale='Viridis',
+        marker_line_width=0.5,
+    ))
+    fig.update_geos(fitbounds="locations", visible=False)
+    fig.update_layout(margin={"r":0,"t":60,"l":0,"b":0}, height=720)
+    return fig
+
+@profiling.timed("figure")
+def render_choropleth(template, df, color, hover_cols, title, location_col='state'):
+    """Copy of the cached template with only the per-render arrays (locations, colors, hover data) swapped in."""
+    custom = [c for c in hover_cols if c != location_col]
+    hover = "<br>".join([f"{location_col}=%{{location}}"] + [f"{c}=%{{customdata[{i}]:,.0f}}" for i, c in enumerate(custom)])
+    fig = go.Figure(template)
+    fig.update_traces(
+        locations=df[location_col].astype(str).to_numpy(),
+        z=df[color].to_numpy(),
+        customdata=df[custom].to_numpy(),
+        hovertemplate=hover + "<extra></extra>",
+        colorbar_title_text=color,
+    )
+    fig.update_layout(title_text=title)
+    return fig
+
+# Loaded data is cached with st.cache_resource: one read-only copy per process,
+# shared by every session and returned without the pickle/copy st.cache_data does
+# on each hit. Pages derive new frames from it and never modify it in place.
+@profiling.cache(st.cache_resource)
+def get_query_backend(name: str):
+    """One backend per process (for postgres: one pooled engine), shared by all sessions."""
+    return get_backend(name)
+
+@profiling.cache(st.cache_resource)
+def load_cube(version: str, name: str = "state_cube"):
+    """Rollup cube (see rollup.py) from the query backend; state names are normalized. Cached per data version."""
+    return get_query_backend(BACKEND).cube(name)
+
+@profiling.cache(st.cache_resource)
+def get_page_years(version: str, page: str):
+    """Years in the page's tables, for its year slider; reads only the columns listed in PAGES."""
+    return get_query_backend(BACKEND).years(PAGES[page]["datasets"])
+
+@profiling.cache(st.cache_resource)
+def get_snapshot(version: str):
+    """
+    Precomputed scenario results for this snapshot version (snapshots.py).
+    Raises FileNotFoundError if not built; exceptions are not cached, so a later build is picked up.
+    """
+    snapshot = load_snapshot()
+    if snapshot is None:
+        raise FileNotFoundError(f"no snapshot for version {version}; run `python snapshots.py`")
+    return snapshot
 
-def aggregate_master_state(dfs, geo_states):
+@profiling.cache(st.cache_resource)
+def run_query(version: str, name: str, year_from: int, year_to: int):
     """
-    Aggregate each CSV to state-level metrics and merge into master_df.
-    final master_df columns include:
-    - transaction_amount, transaction_count, map_trans_amount, map_trans_count, dist_trans_amount, pin_trans_amount
-    - total_users, map_users, map_app_opens, dist_user_count, pin_user_count
-    - insurance_amount, insurance_count, map_ins_amount, map_ins_count, dist_ins_amount, pin_ins_amount
-    - total_activity (sum of all numeric columns)
+    One named aggregate query (backends.py) for a year range. Cached per data version.
+    Served from the snapshot when one matches the current data, else run on the backend.
     """
-    # TRANSACTIONS
-    agg_trans = pd.DataFrame(columns=['state','transaction_amount','transaction_count'])
-    if not dfs.get('agg_trans', pd.DataFrame()).empty:
-        t = dfs['agg_trans']
-        amt_col = 'transaction_amount' if 'transaction_amount' in t.columns else next((c for c in ['amount','total_amount'] if c in t.columns), None)
-        cnt_col = 'transaction_count' if 'transaction_count' in t.columns else next((c for c in ['count','total_count'] if c in t.columns), None)
-        agg = {}
-        if amt_col: agg[amt_col] = 'sum'
-        if cnt_col: agg[cnt_col] = 'sum'
-        if agg:
-            agg_trans = t.groupby('state', as_index=False).agg(agg)
-            if amt_col and amt_col != 'transaction_amount': agg_trans = agg_trans.rename(columns={amt_col:'transaction_amount'})
-            if cnt_col and cnt_col != 'transaction_count': agg_trans = agg_trans.rename(columns={cnt_col:'transaction_count'})
-
-    # MAP TRANSACTIONS
-    map_trans = pd.DataFrame(columns=['state','map_trans_amount','map_trans_count'])
-    if not dfs.get('map_trans', pd.DataFrame()).empty:
-        mt = dfs['map_trans']
-        amt = next((c for c in ['amount','transaction_amount','p_amount'] if c in mt.columns), None)
-        cnt = next((c for c in ['count','transaction_count','p_count'] if c in mt.columns), None)
-        sums={}
-        if amt: sums[amt]='sum'
-        if cnt: sums[cnt]='sum'
-        if sums:
-            map_trans = mt.groupby('state', as_index=False).agg(sums)
-            if amt and amt != 'map_trans_amount': map_trans = map_trans.rename(columns={amt:'map_trans_amount'})
-            if cnt and cnt != 'map_trans_count': map_trans = map_trans.rename(columns={cnt:'map_trans_count'})
-
-    # TOP TRANSACTIONS (district/pincode)
-    top_tx_dist = sum_if_present(dfs.get('top_tx_dist', pd.DataFrame()), ['d_amount','d_amount '], 'dist_trans_amount')
-    top_tx_pin = sum_if_present(dfs.get('top_tx_pin', pd.DataFrame()), ['p_amount','p_amount '], 'pin_trans_amount')
-
-    # USERS
-    agg_user = pd.DataFrame(columns=['state','total_users'])
-    if not dfs.get('agg_user', pd.DataFrame()).empty:
-        u = dfs['agg_user']
-        user_col = next((c for c in ['brand_count','registered_users','registeredusers','total_users'] if c in u.columns), None)
-        if user_col:
-            agg_user = u.groupby('state', as_index=False)[user_col].sum().rename(columns={user_col:'total_users'})
-
-    map_user = pd.DataFrame(columns=['state','map_users','map_app_opens'])
-    if not dfs.get('map_user', pd.DataFrame()).empty:
-        mu = dfs['map_user']
-        reg = next((c for c in ['registered_users','registeredusers'] if c in mu.columns), None)
-        app = next((c for c in ['app_opens','appopens'] if c in mu.columns), None)
-        sums={}
-        if reg: sums[reg]='sum'
-        if app: sums[app]='sum'
-        if sums:
-            map_user = mu.groupby('state', as_index=False).agg(sums)
-            if reg and reg != 'map_users': map_user = map_user.rename(columns={reg:'map_users'})
-            if app and app != 'map_app_opens': map_user = map_user.rename(columns={app:'map_app_opens'})
-
-    top_user_dist = sum_if_present(dfs.get('top_user_dist', pd.DataFrame()), ['registeredusers_d','registered_users','registeredusers'], 'dist_user_count')
-    top_user_pin = sum_if_present(dfs.get('top_user_pin', pd.DataFrame()), ['registeredusers_p','registeredusers_p '], 'pin_user_count')
-
-    # INSURANCE
-    agg_ins = pd.DataFrame(columns=['state','insurance_amount','insurance_count'])
-    if not dfs.get('agg_ins', pd.DataFrame()).empty:
-        ins = dfs['agg_ins']
-        ins_amt = next((c for c in ['insurance_amount','amount','total_amount'] if c in ins.columns), None)
-        ins_cnt = next((c for c in ['insurance_count','count'] if c in ins.columns), None)
-        sums={}
-        if ins_amt: sums[ins_amt]='sum'
-        if ins_cnt: sums[ins_cnt]='sum'
-        if sums:
-            agg_ins = ins.groupby('state', as_index=False).agg(sums)
-            if ins_amt and ins_amt != 'insurance_amount': agg_ins = agg_ins.rename(columns={ins_amt:'insurance_amount'})
-            if ins_cnt and ins_cnt != 'insurance_count': agg_ins = agg_ins.rename(columns={ins_cnt:'insurance_count'})
-
-    map_ins = pd.DataFrame(columns=['state','map_ins_amount','map_ins_count'])
-    if not dfs.get('map_ins', pd.DataFrame()).empty:
-        mi = dfs['map_ins']
-        amt = next((c for c in ['insurance_amount','amount','p_amount'] if c in mi.columns), None)
-        cnt = next((c for c in ['insurance_count','count','p_count'] if c in mi.columns), None)
-        sums={}
-        if amt: sums[amt]='sum'
-        if cnt: sums[cnt]='sum'
-        if sums:
-            map_ins = mi.groupby('state', as_index=False).agg(sums)
-            if amt and amt != 'map_ins_amount': map_ins = map_ins.rename(columns={amt:'map_ins_amount'})
-            if cnt and cnt != 'map_ins_count': map_ins = map_ins.rename(columns={cnt:'map_ins_count'})
-
-    top_ins_dist = sum_if_present(dfs.get('top_ins_dist', pd.DataFrame()), ['d_amount','d_amount '], 'dist_ins_amount')
-    top_ins_pin = sum_if_present(dfs.get('top_ins_pin', pd.DataFrame()), ['p_amount','p_amount '], 'pin_ins_amount')
-
-    # Merge all pieces into master
-    parts = [agg_trans, map_trans, top_tx_dist, top_tx_pin,
-             agg_user, map_user, top_user_dist, top_user_pin,
-             agg_ins, map_ins, top_ins_dist, top_ins_pin]
-    master = None
-    for p in parts:
-        if master is None:
-            master = p.copy()
-        else:
-            master = master.merge(p, on='state', how='outer')
-    if master is None:
-        master = pd.DataFrame({'state': list(geo_states)})
-    # add missing states
-    if 'state' in master.columns:
-        missing = set(geo_states) - set(master['state'].unique())
-        if missing:
-            add = pd.DataFrame({'state': list(missing)})
-            master = pd.concat([master, add], ignore_index=True, sort=False)
-    # numeric conversions and fill
-    for c in master.columns:
-        if c != 'state':
-            master[c] = pd.to_numeric(master[c], errors='coerce').fillna(0)
-    # compute total_activity
-    numeric_cols = [c for c in master.columns if c != 'state']
-    master['total_activity'] = master[numeric_cols].sum(axis=1)
-    master = master.sort_values('state').reset_index(drop=True)
-    return master
+    if SNAPSHOTS and BACKEND in SNAPSHOT_BACKENDS:
+        try:
+            snapshot = get_snapshot(snapshot_version())
+        except FileNotFoundError:
+            snapshot = None
+        if snapshot is not None and snapshot.covers(name, year_from, year_to):
+            return snapshot.query(name, year_from, year_to)
+    return get_query_backend(BACKEND).query(name, year_from, year_to)
+
+@profiling.cache(st.cache_resource)
+def get_slice_indexes(version: str, geo_states: tuple):
+    """
+    Period/category slice indexes over the cubes, shared by all sessions (see slices.py).
+    Each index keeps its own LRU cache of computed filters.
+    """
+    state_index = SliceIndex(load_cube(version), list(METRICS), geo_states)
+    tx_index = CategorySliceIndex(load_cube(version, 'transaction_type_cube'), 'transaction_type',
+                                  ['transaction_amount', 'transaction_count'], geo_states)
+    ins_index = CategorySliceIndex(load_cube(version, 'insurance_type_cube'), 'insurance_type',
+                                   ['insurance_amount', 'insurance_count'], geo_states)
+    return state_index, tx_index, ins_index
+
+@profiling.cache(st.cache_resource(max_entries=16))
+def get_drill_index(version: str, state: str):
+    """Drill-down index of one state (drilldown.py); only that state's file is read."""
+    return DrillIndex(load_state(state))
+
+@profiling.cache(st.cache_resource(max_entries=32))
+def get_growth_matrix(version: str, level: str, metric: str):
+    """Entity x quarter matrix of one metric (growth.py): states from the rollup cube, districts from the local Map_* tables."""
+    if level == "State":
+        return GrowthMatrix.from_frame(load_cube(version), "state", metric)
+    return GrowthMatrix.from_frame(load_district_metric(metric), "entity", "value")
+
+def show_chart(fig, name):
+    """st.plotly_chart, recorded as a render span; with profiling on, the figure's JSON payload size too."""
+    if profiling.ENABLED:
+        with span("payload", name) as extra:
+            extra["payload_bytes"] = len(fig.to_json())
+    with span("render", name):
+        st.plotly_chart(fig, use_container_width=True)
 
 # -----------------------------
-# Load CSVs and build master
+# Sidebar: scenarios (Key1..Key5)
 # -----------------------------
-dfs = load_all_csvs(CSV_PATHS)
-geojson = load_geojson(GEOJSON_URL)
-geo_states = [feat["properties"]["ST_NM"] for feat in geojson["features"]]
-master_df = aggregate_master_state(dfs, geo_states)
+st.sidebar.header("Business Insights (Key1..Key5)")
+page = st.sidebar.radio("Choose page", list(PAGES))
+
+# PULSE_PROFILE=1: record this run's spans and cache hits for the Profiling panel
+if profiling.ENABLED:
+    profiling.serve_metrics()
+    profiling.start_run(page, st.session_state.setdefault("profile_session", os.urandom(4).hex()))
 
 # -----------------------------
-# Sidebar: scenarios (Key1..Key4)
+# Load what this page needs: its queries and (Home) the map
 # -----------------------------
-st.sidebar.header("Business Insights (Key1..Key5)")
-page = st.sidebar.radio("Choose page", [
-    "Home (Transactions / Users / Insurance)",
-    "Scenario 1: Top States by Transactions (Key1)",
-    "Scenario 2: Yearly Transaction Growth (Key2)",
-    "Scenario 3: Insurance Penetration (Key3)",
-    "Scenario 4: User Engagement by Brand (Key4)"
-])
+# backend results are cached per backend version (local data, or the postgres load);
+# the local-only views are cached per local data version
+version = f"{get_query_backend(BACKEND).version()}-{BACKEND}"
+local_version = cube_version()
+results = {}
+if PAGES[page]["queries"]:
+    page_years = get_page_years(version, page) or [0]
+    year_from, year_to = st.sidebar.select_slider("Years", options=page_years, value=(page_years[0], page_years[-1]))
+    results = {name: run_query(version, name, year_from, year_to) for name in PAGES[page]["queries"]}
+geojson, geo_error, geo_key = None, None, None
+if PAGES[page].get("geo"):
+    geo_key = geo_version() or "remote"
+    try:
+        geojson = get_geojson(geo_key, MAP_DETAIL)
+    except (OSError, ValueError, requests.RequestException) as e:
+        geo_error = str(e)
+if geojson is not None:
+    geo_states = [feat["properties"]["ST_NM"] for feat in geojson["features"]]
+    # data states the map cannot place (would be silently dropped from the choropleth)
+    unmatched_states, _ = reconcile(load_cube(version)['state'].unique(), geo_states)
+    if unmatched_states:
+        st.warning("States not found in the map GeoJSON: " + ", ".join(unmatched_states))
+else:
+    geo_states = sorted(set(STATE_NAMES.values()))
 
 # HOME
 
@@ -302,141 +274,209 @@ if page == "Home (Transactions / Users / Insurance)":
         ]
         title = "Insurance — insurance_amount"
 
-    # Only keep hover columns that exist in master_df
-    hover_cols = [c for c in hover_cols if c in master_df.columns]
+    # Period / category filters, served from the pre-indexed slice cache
+    state_index, tx_index, ins_index = get_slice_indexes(version, tuple(geo_states))
+    years = state_index.years
+    f1, f2, f3 = st.columns(3)
+    year_from, year_to = f1.select_slider("Years", options=years, value=(years[0], years[-1])) if years else (0, 0)
+    quarters = tuple(sorted(f2.multiselect("Quarters", options=[1, 2, 3, 4], default=[1, 2, 3, 4])))
+    type_index, types = None, ()
+    if category == "Transactions":
+        type_index = tx_index
+        types = f3.multiselect("Transaction type", options=tx_index.categories, default=tx_index.categories)
+    elif category == "Insurance":
+        type_index = ins_index
+        types = f3.multiselect("Insurance type", options=ins_index.categories, default=ins_index.categories)
+
+    with span("aggregate", "slice_totals"):
+        map_df = state_index.totals(year_from, year_to, quarters)
+    if type_index is not None and set(types) != set(type_index.categories):
+        # Only the Aggregated datasets carry a type; the Map/Top metrics stay unfiltered by type
+        typed = type_index.totals(year_from, year_to, quarters, tuple(sorted(types)))
+        map_df = map_df.drop(columns=type_index.metrics).merge(typed, on='state', how='left').fillna(0)
+        st.caption(f"Type filter applies to {', '.join(type_index.metrics)}.")
+    map_df = map_df.assign(total_activity=map_df[list(METRICS)].sum(axis=1))
+
+    # Only keep hover columns that exist in map_df
+    hover_cols = [c for c in hover_cols if c in map_df.columns]
 
     # Warn if selected_metric missing; fallback to total_activity
-    if selected_metric not in master_df.columns:
+    if selected_metric not in map_df.columns:
         st.warning(f"Main metric '{selected_metric}' not found. Coloring by total_activity instead.")
         color_metric = 'total_activity'
     else:
         color_metric = selected_metric
 
-    # build and display choropleth
-    fig = px.choropleth(
-        master_df,
-        geojson=geojson,
-        locations='state',
-        featureidkey="properties.ST_NM",
-        color=color_metric,
-        hover_data=hover_cols,
-        color_continuous_scale='Viridis',
-        title=f"India — {title}"
-    )
-    fig.update_geos(fitbounds="locations", visible=False)
-    fig.update_layout(margin={"r":0,"t":60,"l":0,"b":0}, height=720)
-    st.plotly_chart(fig, use_container_width=True)
+    # display choropleth: the cached base figure with this filter's values
+    if geojson is None:
+        st.error(f"Map boundaries unavailable ({geo_error}). Run `python geo.py` to rebuild them from geo/source.")
+    else:
+        fig = render_choropleth(choropleth_template(geo_key, MAP_DETAIL), map_df, color_metric, hover_cols, f"India — {title}")
+        show_chart(fig, "india_map")
 
     st.markdown(f"### Top 5 states by {color_metric}")
-    if color_metric in master_df.columns:
-        st.dataframe(master_df[['state', color_metric]].sort_values(color_metric, ascending=False).head(5).style.format({color_metric:'{:,.0f}'}), height=220)
+    if color_metric in map_df.columns:
+        st.dataframe(map_df[['state', color_metric]].sort_values(color_metric, ascending=False).head(5).style.format({color_metric:'{:,.0f}'}), height=220)
     else:
         st.info("No metric available to show top states.")
 
+    # Drill-down: one state's districts and top pincodes for one period
+    st.markdown("### Drill down")
+    d1, d2, d3, d4 = st.columns(4)
+    drill_state = d1.selectbox("State", options=map_df.sort_values(color_metric, ascending=False)['state'].astype(str).tolist())
+    drill_index = get_drill_index(drill_version(), drill_state)
+    if not drill_index.periods:
+        st.info(f"No district or pincode data for {drill_state}.")
+    else:
+        drill_years = sorted({y for y, _ in drill_index.periods})
+        drill_year = d2.selectbox("Year", options=drill_years, index=len(drill_years) - 1)
+        drill_quarters = [q for y, q in drill_index.periods if y == drill_year]
+        drill_quarter = d3.selectbox("Quarter", options=drill_quarters, index=len(drill_quarters) - 1)
+        drill_metric = d4.selectbox("Metric", options=list(DRILL_SOURCES[category]["district"][2]))
+
+        districts = drill_index.lookup(category, "district", drill_metric, drill_year, drill_quarter)
+        districts = districts.assign(district=districts['entity'].map(lambda d: district_key(d).title()))
+        try:
+            district_geo = get_district_geojson(geo_key, MAP_DETAIL, drill_state)
+        except (OSError, ValueError):
+            district_geo = None
+        drill_title = f"{drill_state} — {drill_metric}, {drill_year} Q{drill_quarter}"
+        if district_geo is not None and not districts.empty:
+            # locations must use the asset's own district spelling
+            names = {district_key(f["properties"]["district"]): f["properties"]["district"] for f in district_geo["features"]}
+            districts['district'] = [names.get(district_key(d), d) for d in districts['entity']]
+            fig = render_choropleth(choropleth_template(geo_key, MAP_DETAIL, drill_state), districts,
+                                    'value', ['district', 'value'], drill_title, location_col='district')
+            show_chart(fig, "district_map")
+        elif not districts.empty:
+            with span("figure", "district_bar"):
+                fig = px.bar(districts, x='district', y='value', title=drill_title)
+                fig.update_layout(xaxis_tickangle=-45)
+            show_chart(fig, "district_bar")
+
+        pincodes = drill_index.lookup(category, "pincode", drill_metric, drill_year, drill_quarter, TOP_N)
+        st.markdown(f"#### Top {TOP_N} pincodes by {drill_metric}")
+        if pincodes.empty:
+            st.info(f"No pincode data for {drill_metric} in {drill_year} Q{drill_quarter}.")
+        else:
+            st.dataframe(pincodes.rename(columns={'entity': 'pincode'}).style.format({'value': '{:,.0f}'}),
+                         hide_index=True)
+
 # -----------------------------
 # Scenario 1 (Key1)
 # -----------------------------
 elif page == "Scenario 1: Top States by Transactions (Key1)":
     st.header("Scenario 1 — Top 10 States by Transaction Value (Key1)")
-    if not dfs.get('agg_trans', pd.DataFrame()).empty:
-        t = dfs['agg_trans']
-        amt_col = 'transaction_amount' if 'transaction_amount' in t.columns else next((c for c in ['amount','total_amount'] if c in t.columns), None)
-        if amt_col:
-            top_states = t.groupby('state', as_index=False)[amt_col].sum().rename(columns={amt_col:'total_amount'}).sort_values('total_amount', ascending=False).head(10)
+    top_states = results['top_states']
+    if top_states['total_amount'].any():
+        with span("figure", "top_states"):
             fig = px.bar(top_states, x='state', y='total_amount', text_auto=True, title='Top 10 States by Transaction Amount')
-            st.plotly_chart(fig, use_container_width=True)
-            st.dataframe(top_states.style.format({'total_amount':'{:,.0f}'}), height=300)
-        else:
-            st.info("Transaction amount column not found in agg_trans CSV.")
+        show_chart(fig, "top_states")
+        st.dataframe(top_states.style.format({'total_amount':'{:,.0f}'}), height=300)
     else:
-        st.info("agg_trans CSV not available.")
+        st.info("agg_trans data not available.")
 
 # -----------------------------
 # Scenario 2 (Key2)
 # -----------------------------
 elif page == "Scenario 2: Yearly Transaction Growth (Key2)":
     st.header("Scenario 2 — Yearly Transaction Growth (Key2)")
-    if not dfs.get('agg_trans', pd.DataFrame()).empty:
-        t = dfs['agg_trans']
-        if 'year' in t.columns:
-            amt_col = 'transaction_amount' if 'transaction_amount' in t.columns else next((c for c in ['amount','total_amount'] if c in t.columns), None)
-            if amt_col:
-                yearly = t.groupby('year', as_index=False)[amt_col].sum().rename(columns={amt_col:'total_amount'}).sort_values('year')
-                fig = px.line(yearly, x='year', y='total_amount', markers=True, title='Yearly Transaction Growth')
-                st.plotly_chart(fig, use_container_width=True)
-                st.dataframe(yearly.style.format({'total_amount':'{:,.0f}'}), height=300)
-            else:
-                st.info("Transaction amount column not found in agg_trans CSV.")
-        else:
-            st.info("Year column not present in agg_trans CSV.")
+    yearly = results['yearly_growth']
+    if yearly['total_amount'].any():
+        with span("figure", "yearly_growth"):
+            fig = px.line(yearly, x='year', y='total_amount', markers=True, title='Yearly Transaction Growth')
+        show_chart(fig, "yearly_growth")
+        st.dataframe(yearly.style.format({'total_amount':'{:,.0f}'}), height=300)
     else:
-        st.info("agg_trans CSV not available.")
+        st.info("agg_trans data not available.")
 
 # -----------------------------
 # Scenario 3 (Key3)
 # -----------------------------
 elif page == "Scenario 3: Insurance Penetration (Key3)":
     st.header("Scenario 3 — Insurance Penetration & Growth (Key3)")
-    if not dfs.get('agg_ins', pd.DataFrame()).empty and not dfs.get('agg_trans', pd.DataFrame()).empty:
-        ins = dfs['agg_ins']
-        trans = dfs['agg_trans']
-        ins_amt_col = 'insurance_amount' if 'insurance_amount' in ins.columns else next((c for c in ['amount','total_amount'] if c in ins.columns), None)
-        trans_amt_col = 'transaction_amount' if 'transaction_amount' in trans.columns else next((c for c in ['amount','total_amount'] if c in trans.columns), None)
-        if ins_amt_col and trans_amt_col:
-            ins_state = ins.groupby('state', as_index=False)[ins_amt_col].sum().rename(columns={ins_amt_col:'insurance_amount'})
-            trans_state = trans.groupby('state', as_index=False)[trans_amt_col].sum().rename(columns={trans_amt_col:'transaction_amount'})
-            merged = ins_state.merge(trans_state, on='state', how='outer').fillna(0)
-            merged['penetration_pct'] = (merged['insurance_amount'] / merged['transaction_amount'].replace({0:np.nan})) * 100
-            merged['penetration_pct'] = merged['penetration_pct'].fillna(0)
+    merged = results['insurance_penetration'].copy()
+    if merged['insurance_amount'].any() and merged['transaction_amount'].any():
+        merged['penetration_pct'] = (merged['insurance_amount'] / merged['transaction_amount'].replace({0:np.nan})) * 100
+        merged['penetration_pct'] = merged['penetration_pct'].fillna(0)
+        with span("figure", "insurance_penetration"):
             fig1 = px.bar(merged.sort_values('penetration_pct', ascending=False).head(15), x='state', y='penetration_pct', text_auto=True, title='Top States by Insurance Penetration (%)')
-            st.plotly_chart(fig1, use_container_width=True)
             fig2 = px.bar(merged.sort_values('insurance_amount', ascending=False).head(15), x='state', y='insurance_amount', text_auto=True, title='Top States by Insurance Amount')
-            st.plotly_chart(fig2, use_container_width=True)
-            st.dataframe(merged.sort_values('penetration_pct', ascending=False).head(15).style.format({'insurance_amount':'{:,.0f}','transaction_amount':'{:,.0f}','penetration_pct':'{:,.2f}'}), height=300)
-        else:
-            st.info("Insurance or transaction amount column missing in agg_ins/agg_trans.")
+        show_chart(fig1, "insurance_penetration")
+        show_chart(fig2, "insurance_amount")
+        st.dataframe(merged.sort_values('penetration_pct', ascending=False).head(15).style.format({'insurance_amount':'{:,.0f}','transaction_amount':'{:,.0f}','penetration_pct':'{:,.2f}'}), height=300)
     else:
-        st.info("agg_ins or agg_trans CSV not available.")
+        st.info("agg_ins or agg_trans data not available.")
 
 # -----------------------------
 # Scenario 4 (Key4)
 # -----------------------------
 elif page == "Scenario 4: User Engagement by Brand (Key4)":
     st.header("Scenario 4 — Device Dominance & User Engagement (Key4)")
-    if not dfs.get('agg_user', pd.DataFrame()).empty:
-        u = dfs['agg_user']
-        brand_col = next((c for c in ['brand','device','manufacturer'] if c in u.columns), None)
-        user_col = next((c for c in ['brand_count','registered_users','registeredusers','total_users'] if c in u.columns), None)
-        if brand_col and user_col:
-            brand_tot = u.groupby(brand_col, as_index=False)[user_col].sum().rename(columns={brand_col:'brand', user_col:'brand_count'}).sort_values('brand_count', ascending=False)
+    brand_tot = results['brand_users']
+    if not brand_tot.empty:
+        with span("figure", "brand_users"):
             fig = px.bar(brand_tot.head(15), x='brand', y='brand_count', text_auto=True, title='Top 15 Mobile Brands by User Count')
             fig.update_layout(xaxis_tickangle=-45)
-            st.plotly_chart(fig, use_container_width=True)
-            st.dataframe(brand_tot.head(50).style.format({'brand_count':'{:,.0f}'}), height=300)
-        else:
-            st.info("Brand/user columns not found in agg_user CSV.")
+        show_chart(fig, "brand_users")
+        st.dataframe(brand_tot.head(50).style.format({'brand_count':'{:,.0f}'}), height=300)
     else:
-        st.info("agg_user CSV not available.")
+        st.info("agg_user data not available.")
 
     # engagement ratio
-    if not dfs.get('map_user', pd.DataFrame()).empty and not dfs.get('agg_user', pd.DataFrame()).empty:
-        mu = dfs['map_user']
-        au = dfs['agg_user']
-        app_col = next((c for c in ['app_opens','appopens'] if c in mu.columns), None)
-        reg_col = next((c for c in ['brand_count','registered_users','registeredusers','total_users'] if c in au.columns), None)
-        if app_col and reg_col:
-            app_state = mu.groupby('state', as_index=False)[app_col].sum().rename(columns={app_col:'app_opens'})
-            reg_state = au.groupby('state', as_index=False)[reg_col].sum().rename(columns={reg_col:'registered_users'})
-            merged = app_state.merge(reg_state, on='state', how='outer').fillna(0)
-            merged['engagement_ratio'] = merged['app_opens'] / merged['registered_users'].replace({0:np.nan})
-            merged['engagement_ratio'] = merged['engagement_ratio'].fillna(0)
+    merged = results['engagement'].copy()
+    if merged['app_opens'].any() and merged['registered_users'].any():
+        merged['engagement_ratio'] = merged['app_opens'] / merged['registered_users'].replace({0:np.nan})
+        merged['engagement_ratio'] = merged['engagement_ratio'].fillna(0)
+        with span("figure", "engagement"):
             fig2 = px.bar(merged.sort_values('engagement_ratio', ascending=False).head(15), x='state', y='engagement_ratio', text_auto=True, title='Top States by App Opens per Registered User')
-            st.plotly_chart(fig2, use_container_width=True)
-            st.dataframe(merged.sort_values('engagement_ratio', ascending=False).head(15).style.format({'app_opens':'{:,.0f}','registered_users':'{:,.0f}','engagement_ratio':'{:,.2f}'}), height=300)
-        else:
-            st.info("app_opens or registered user column missing in map_user/agg_user.")
+        show_chart(fig2, "engagement")
+        st.dataframe(merged.sort_values('engagement_ratio', ascending=False).head(15).style.format({'app_opens':'{:,.0f}','registered_users':'{:,.0f}','engagement_ratio':'{:,.2f}'}), height=300)
+    else:
+        st.info("map_user or agg_user data not available for engagement ratio.")
+
+# -----------------------------
+# Scenario 5 (Key5)
+# -----------------------------
+elif page == "Scenario 5: Growth Trends by State / District (Key5)":
+    st.header("Scenario 5 — QoQ / YoY Growth, CAGR & Rolling Trends (Key5)")
+    g1, g2, g3 = st.columns(3)
+    level = g1.radio("Granularity", options=["State", "District"], horizontal=True)
+    metric_options = list(METRICS) if level == "State" else list(district_metrics())
+    metric = g2.selectbox("Metric", options=metric_options)
+    growth = get_growth_matrix(version if level == "State" else local_version, level, metric)
+    if not len(growth.periods):
+        st.info(f"No {level.lower()} data available for {metric}.")
     else:
-        st.info("map_user or agg_user CSV not available for engagement ratio.")
+        labels = growth.labels
+        period = g3.selectbox("Quarter", options=labels, index=len(labels) - 1)
+        year, quarter = (int(x) for x in period.split("-Q"))
+        summary = growth.summary(year, quarter)
+        if level == "District":
+            district_states = sorted({e.split(" / ")[0] for e in summary['entity']})
+            state_filter = st.selectbox("State", options=["All states"] + district_states)
+            if state_filter != "All states":
+                summary = summary[summary['entity'].str.startswith(f"{state_filter} / ")]
+        summary = summary.dropna(subset=['value']).sort_values('rank')
+
+        movers = summary.dropna(subset=['yoy']).sort_values('yoy', ascending=False).head(15)
+        with span("figure", "growth_movers"):
+            fig = px.bar(movers, x='entity', y='yoy', text_auto='.1%', title=f'Fastest YoY Growth in {metric} — {period}')
+            fig.update_layout(xaxis_tickangle=-45, yaxis_tickformat='.0%')
+        show_chart(fig, "growth_movers")
+
+        # trailing 4-quarter sums smooth out the quarterly seasonality
+        leaders = summary['entity'].head(5).tolist()
+        selected = st.multiselect(f"{level}s to plot", options=summary['entity'].tolist(), default=leaders)
+        trend = growth.to_long(growth.rolling(4), 'rolling_4q', entities=selected)
+        with span("figure", "growth_trend"):
+            fig2 = px.line(trend, x='period', y='rolling_4q', color='entity', markers=True, title=f'{metric} — trailing 4-quarter sum')
+        show_chart(fig2, "growth_trend")
+
+        st.dataframe(summary.head(100).style.format({
+            'value':'{:,.0f}', 'rolling_4q':'{:,.0f}', 'qoq':'{:+.1%}', 'yoy':'{:+.1%}', 'cagr':'{:+.1%}',
+            'rank':'{:.0f}', 'rank_change_qoq':'{:+.0f}', 'rank_change_yoy':'{:+.0f}'}, na_rep='—'), height=400)
+        st.caption("Rank changes are places gained (positive = moved up); CAGR runs between the first and last complete years.")
 
 
 # -----------------------------
@@ -445,3 +485,33 @@ elif page == "Scenario 4: User Engagement by Brand (Key4)":
 st.markdown("---")
 st.caption("### Data visualisation dashboard built with Streamlit and Plotly.")
 
+# -----------------------------
+# Profiling panel (PULSE_PROFILE=1)
+# -----------------------------
+profile_run = profiling.end_run()
+if profile_run is not None:
+    history = st.session_state.setdefault("profile_history", [])
+    history.append(profile_run.to_dict())
+    del history[:-profiling.HISTORY_SIZE]
+    with st.expander(f"Profiling — this run {profile_run.seconds * 1000:,.0f} ms", expanded=False):
+        spans = pd.DataFrame(profile_run.spans)
+        if not spans.empty:
+            spans['ms'] = spans['seconds'] * 1000
+            st.markdown("**Time by stage** (top-level spans)")
+            st.dataframe(spans[spans['depth'] == 0].groupby('stage')['ms'].agg(['count', 'sum']).sort_values('sum', ascending=False)
+                         .style.format({'sum': '{:,.1f}'}))
+            st.markdown("**Spans** (in call order; nested spans are indented by depth)")
+            cols = [c for c in ['offset', 'depth', 'stage', 'name', 'ms', 'rss_delta', 'traced_delta', 'payload_bytes', 'hit'] if c in spans.columns]
+            st.dataframe(spans.sort_values('offset')[cols].style.format({'offset': '{:.3f}', 'ms': '{:,.1f}'}, na_rep=''), hide_index=True)
+        if profile_run.cache:
+            st.markdown("**Cache hits / misses** (this run)")
+            st.dataframe(pd.DataFrame(profile_run.cache).T)
+        st.markdown("**This session**")
+        st.dataframe(pd.DataFrame([{'page': r['page'], 'ms': r['seconds'] * 1000, 'spans': len(r['spans'])} for r in history])
+                     .groupby('page')['ms'].describe()[['count', 'mean', '50%', 'max']].style.format('{:,.1f}'))
+        e1, e2 = st.columns(2)
+        e1.download_button("Session runs (JSON lines)", "\n".join(json.dumps(r, default=str) for r in history),
+                           file_name="pulse-profile.jsonl", mime="application/x-ndjson")
+        e2.download_button("Process totals (Prometheus text)", profiling.prometheus_text(),
+                           file_name="pulse-metrics.prom", mime="text/plain")
+
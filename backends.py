@@ -0,0 +1,296 @@
+"""Pluggable query backends for the dashboard views.
+
+Every view the dashboard draws (the state cube behind the master map, and the
+four scenario pages) is one named query, answered by the configured backend:
+
+  pandas    groupbys over the local datasets (memory-mapped Arrow cache, see
+            storage.py) and the persisted rollup cubes; the default
+  postgres  aggregates pushed down to the tables loaded by db_load.py, over a
+            pooled SQLAlchemy engine. Year filters use the (Year, Quater, State)
+            index, per-state lookups the (State, Year, Quater) one.
+  duckdb    embedded DuckDB over the Parquet copies (CSV when missing); the
+            year filters are pushed into the Parquet scan, where row-group
+            min/max statistics skip what they can.
+
+Only aggregated rows (one per state, year or brand) come back from the SQL
+backends, so the dashboard no longer needs the raw tables in memory. Pick the
+backend with PULSE_BACKEND=pandas|postgres|duckdb; postgres reads PULSE_PG_DSN.
+
+Backend.version() is the key the dashboard caches results under: the local
+data version for pandas and duckdb, the load version db_load.py writes for
+postgres.
+"""
+import os
+import re
+import threading
+
+import pandas as pd
+
+from datasets import DATASETS, PARTITION_COLS, csv_path
+from profiling import timed
+from rollup import KEY_COLS, TYPE_CUBES, assemble_state_cube, cube_version, load_state_cube, metrics_by_dataset
+from states import normalize_state_col
+from storage import has_parquet, parquet_path, read_dataset, read_datasets
+
+DEFAULT_BACKEND = os.environ.get("PULSE_BACKEND", "pandas")
+
+# Every query takes :year_from and :year_to (inclusive); top_states also :limit.
+# Written in the SQL subset PostgreSQL and DuckDB share; unquoted names, so
+# PostgreSQL's lower-casing matches the tables db_load.py creates.
+QUERIES = {
+    "top_states": """
+        SELECT State AS state, CAST(SUM(Transaction_amount) AS DOUBLE PRECISION) AS total_amount
+        FROM Agg_Trans
+        WHERE Year BETWEEN :year_from AND :year_to
+        GROUP BY State
+        ORDER BY total_amount DESC
+        LIMIT :limit""",
+    "yearly_growth": """
+        SELECT Year AS year, CAST(SUM(Transaction_amount) AS DOUBLE PRECISION) AS total_amount
+        FROM Agg_Trans
+        WHERE Year BETWEEN :year_from AND :year_to
+        GROUP BY Year
+        ORDER BY Year""",
+    "insurance_penetration": """
+        WITH tx AS (
+            SELECT State, SUM(Transaction_amount) AS transaction_amount
+            FROM Agg_Trans WHERE Year BETWEEN :year_from AND :year_to GROUP BY State
+        ), ins AS (
+            SELECT State, SUM(Insurance_amount) AS insurance_amount
+            FROM Agg_Insurance WHERE Year BETWEEN :year_from AND :year_to GROUP BY State
+        )
+        SELECT tx.State AS state,
+               CAST(COALESCE(ins.insurance_amount, 0) AS DOUBLE PRECISION) AS insurance_amount,
+               CAST(tx.transaction_amount AS DOUBLE PRECISION) AS transaction_amount
+        FROM tx LEFT JOIN ins ON ins.State = tx.State""",
+    "brand_users": """
+        SELECT Brand AS brand, CAST(SUM(Brand_count) AS DOUBLE PRECISION) AS brand_count
+        FROM Agg_User
+        WHERE Year BETWEEN :year_from AND :year_to
+        GROUP BY Brand
+        ORDER BY brand_count DESC""",
+    "engagement": """
+        WITH users AS (
+            SELECT State, SUM(Brand_count) AS registered_users
+            FROM Agg_User WHERE Year BETWEEN :year_from AND :year_to GROUP BY State
+        ), opens AS (
+            SELECT State, SUM(App_opens) AS app_opens
+            FROM Map_User WHERE Year BETWEEN :year_from AND :year_to GROUP BY State
+        )
+        SELECT users.State AS state,
+               CAST(COALESCE(opens.app_opens, 0) AS DOUBLE PRECISION) AS app_opens,
+               CAST(users.registered_users AS DOUBLE PRECISION) AS registered_users
+        FROM users LEFT JOIN opens ON opens.State = users.State""",
+}
+
+
+def aggregate_sql(key, group_cols, sums):
+    """SELECT <group_cols>, SUM(col) AS alias ... GROUP BY <group_cols> for one dataset table."""
+    select = ", ".join(list(group_cols) + [f"CAST(SUM({col}) AS DOUBLE PRECISION) AS {alias}"
+                                           for alias, col in sums.items()])
+    groups = ", ".join(group_cols)
+    return f"SELECT {select} FROM {DATASETS[key]['table']} GROUP BY {groups}"
+
+
+class Backend:
+    """Answers the named QUERIES and builds the rollup cubes."""
+
+    name = None
+
+    @timed("aggregate")
+    def query(self, name, year_from=0, year_to=9999, limit=10):
+        """Result of one named query with normalized state names."""
+        df = self._query(name, {"year_from": int(year_from), "year_to": int(year_to), "limit": int(limit)})
+        return normalize_state_col(df, "state")
+
+    def cube(self, name="state_cube"):
+        raise NotImplementedError
+
+    def version(self):
+        """Changes whenever the data behind query() and cube() changes."""
+        raise NotImplementedError
+
+    def years(self, columns):
+        """Sorted years with rows in any of the datasets in columns ({dataset key: columns})."""
+        raise NotImplementedError
+
+    def _query(self, name, params):
+        raise NotImplementedError
+
+
+# -----------------------------
+# pandas
+# -----------------------------
+class PandasBackend(Backend):
+    """In-process groupbys; reads only the columns and years a query needs."""
+
+    name = "pandas"
+
+    def __init__(self, data_dir=None):
+        self.data_dir = data_dir
+
+    def cube(self, name="state_cube"):
+        return load_state_cube(self.data_dir, name)
+
+    def version(self):
+        return cube_version(self.data_dir)
+
+    def years(self, columns):
+        """Reads the listed columns concurrently, so the page's queries then find them mapped."""
+        dfs = read_datasets(columns, self.data_dir, prefer="arrow")
+        return sorted({int(y) for df in dfs.values() if not df.empty for y in df["Year"].unique()})
+
+    def _sum_by(self, key, by, col, params):
+        """SUM(col) GROUP BY `by` over the query's years, reading only the columns involved."""
+        cols = list(dict.fromkeys(["Year", by, col]))
+        df = read_dataset(key, columns=cols, data_dir=self.data_dir, prefer="arrow")
+        if df.empty:
+            return pd.DataFrame({by: [], col: []})
+        df = df[df["Year"].between(params["year_from"], params["year_to"])]
+        return df.groupby(by, observed=True)[col].sum().astype("float64").reset_index()
+
+    def _query(self, name, params):
+        if name == "top_states":
+            df = self._sum_by("agg_trans", "State", "Transaction_amount", params)
+            df.columns = ["state", "total_amount"]
+            return df.sort_values("total_amount", ascending=False).head(params["limit"]).reset_index(drop=True)
+        if name == "yearly_growth":
+            df = self._sum_by("agg_trans", "Year", "Transaction_amount", params)
+            df.columns = ["year", "total_amount"]
+            return df.sort_values("year").reset_index(drop=True)
+        if name == "insurance_penetration":
+            tx = self._sum_by("agg_trans", "State", "Transaction_amount", params)
+            ins = self._sum_by("agg_ins", "State", "Insurance_amount", params)
+            df = tx.merge(ins, on="State", how="left").fillna({"Insurance_amount": 0})
+            return df.rename(columns={"State": "state", "Insurance_amount": "insurance_amount",
+                                      "Transaction_amount": "transaction_amount"})[
+                ["state", "insurance_amount", "transaction_amount"]]
+        if name == "brand_users":
+            df = self._sum_by("agg_user", "Brand", "Brand_count", params)
+            df.columns = ["brand", "brand_count"]
+            return df.sort_values("brand_count", ascending=False).reset_index(drop=True)
+        if name == "engagement":
+            users = self._sum_by("agg_user", "State", "Brand_count", params)
+            opens = self._sum_by("map_user", "State", "App_opens", params)
+            df = users.merge(opens, on="State", how="left").fillna({"App_opens": 0})
+            return df.rename(columns={"State": "state", "App_opens": "app_opens",
+                                      "Brand_count": "registered_users"})[["state", "app_opens", "registered_users"]]
+        raise KeyError(name)
+
+
+# -----------------------------
+# SQL (PostgreSQL / DuckDB)
+# -----------------------------
+class SQLBackend(Backend):
+    """Runs QUERIES and the cube aggregates in the database; subclasses provide _execute."""
+
+    def _execute(self, sql, params):
+        raise NotImplementedError
+
+    def _query(self, name, params):
+        return self._execute(QUERIES[name], params)
+
+    def years(self, columns):
+        if not columns:
+            return []
+        sql = " UNION ".join(f"SELECT DISTINCT Year AS year FROM {DATASETS[key]['table']}" for key in columns)
+        return sorted(int(y) for y in self._execute(sql, {})["year"])
+
+    def cube(self, name="state_cube"):
+        """The rollup cubes from one pushed-down GROUP BY per dataset."""
+        if name == "state_cube":
+            parts = []
+            for key, pairs in metrics_by_dataset().items():
+                df = self._execute(aggregate_sql(key, PARTITION_COLS, dict(pairs)), {})
+                df.columns = PARTITION_COLS + [m for m, _ in pairs]
+                parts.append(df.set_index(PARTITION_COLS))
+            return assemble_state_cube(parts)
+        key, type_col, metrics = TYPE_CUBES[name]
+        df = self._execute(aggregate_sql(key, PARTITION_COLS + [type_col], metrics), {})
+        df.columns = KEY_COLS + [type_col.lower()] + list(metrics)
+        return normalize_state_col(df.sort_values(KEY_COLS + [type_col.lower()], ignore_index=True))
+
+
+class PostgresBackend(SQLBackend):
+    """PostgreSQL tables from db_load.py through a pooled SQLAlchemy engine."""
+
+    name = "postgres"
+
+    def __init__(self, dsn=None, pool_size=5):
+        import sqlalchemy
+        from db_load import connect
+        # connections come from db_load.connect, so the DSN forms and PULSE_PG_DSN match the loader
+        self.engine = sqlalchemy.create_engine("postgresql+psycopg2://", creator=lambda: connect(dsn),
+                                               pool_size=pool_size, pool_pre_ping=True)
+        self._text = sqlalchemy.text
+        self._missing_table = sqlalchemy.exc.ProgrammingError
+
+    def version(self):
+        """Load version from db_load.stamp_load; None if the tables were never loaded with one."""
+        from db_load import LOAD_VERSION_KEY, META_TABLE
+        with self.engine.connect() as conn:
+            try:
+                row = conn.execute(self._text(f"SELECT value FROM {META_TABLE} WHERE key = :key"),
+                                   {"key": LOAD_VERSION_KEY}).first()
+            except self._missing_table:
+                return None
+        return row[0] if row else None
+
+    @timed("load")
+    def _execute(self, sql, params):
+        with self.engine.connect() as conn:
+            df = pd.read_sql_query(self._text(sql), conn, params=params)
+        df.columns = [c.lower() for c in df.columns]
+        return df
+
+
+_DUCKDB_TYPES = {"str": "VARCHAR", "int": "BIGINT", "float": "DOUBLE", "Int64": "BIGINT"}
+
+class DuckDBBackend(SQLBackend):
+    """Embedded DuckDB with one view per dataset over its Parquet copy (or CSV)."""
+
+    name = "duckdb"
+
+    def __init__(self, data_dir=None):
+        import duckdb
+        self.data_dir = data_dir
+        self.con = duckdb.connect()
+        self._local = threading.local()
+        for key, spec in DATASETS.items():
+            if has_parquet(key, data_dir):
+                source = f"read_parquet('{parquet_path(key, data_dir)}')"
+            elif os.path.exists(csv_path(key, data_dir)):
+                types = ", ".join(f"'{c}': '{_DUCKDB_TYPES[t]}'" for c, t in spec["columns"].items())
+                source = f"read_csv('{csv_path(key, data_dir)}', header=true, columns={{{types}}})"
+            else:
+                cols = ", ".join(f"{c} {_DUCKDB_TYPES[t]}" for c, t in spec["columns"].items())
+                self.con.execute(f"CREATE TABLE {spec['table']} ({cols})")
+                continue
+            self.con.execute(f"CREATE VIEW {spec['table']} AS SELECT * FROM {source}")
+
+    def version(self):
+        return cube_version(self.data_dir)
+
+    def _cursor(self):
+        # a DuckDB connection is not safe across threads; each Streamlit thread gets its own cursor
+        cur = getattr(self._local, "cursor", None)
+        if cur is None:
+            cur = self._local.cursor = self.con.cursor()
+        return cur
+
+    @timed("load")
+    def _execute(self, sql, params):
+        # :name -> $name, and only pass the parameters the statement uses
+        sql = re.sub(r"(?<!:):(\w+)", r"$\1", sql)
+        used = set(re.findall(r"\$(\w+)", sql))
+        return self._cursor().execute(sql, {k: v for k, v in params.items() if k in used}).df()
+
+
+BACKENDS = {"pandas": PandasBackend, "postgres": PostgresBackend, "duckdb": DuckDBBackend}
+
+def get_backend(name=None, **kwargs):
+    """Backend instance by name (default: PULSE_BACKEND, else pandas)."""
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
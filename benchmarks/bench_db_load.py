@@ -0,0 +1,104 @@
+"""Benchmark: notebook-style executemany vs db_load's pooled COPY loader.
+
+Targets, in order of preference:
+  --dsn "..."        an existing (throwaway!) PostgreSQL database; tables are dropped
+  pgserver           if the `pgserver` package is installed, a temporary local
+                     PostgreSQL is started under a temp directory
+Without either, the benchmark is skipped: db_load only speaks PostgreSQL.
+
+Usage:
+    python benchmarks/bench_db_load.py [--data data] [--dsn ...] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasets import DATASETS, DATA_DIR, read_csv  # noqa: E402
+
+
+def _timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# -----------------------------
+# PostgreSQL
+# -----------------------------
+def pg_baseline(dfs, dsn):
+    """The notebook cells: one connection per table, executemany over .values.tolist()."""
+    import psycopg2
+    from db_load import create_table_sql
+    for key, df in dfs.items():
+        spec = DATASETS[key]
+        cols = list(spec["columns"])
+        conn = psycopg2.connect(dsn)
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {spec['table']}")
+        cursor.execute(create_table_sql(key))
+        rows = df[cols].astype(object).where(df[cols].notna(), None).values.tolist()
+        cursor.executemany(
+            f"INSERT INTO {spec['table']} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})", rows)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+def pg_copy(dfs, dsn, workers):
+    from db_load import load_all
+    load_all(dfs, dsn, workers)
+
+def run_postgres(dfs, dsn, repeat, workers, skip_baseline):
+    results = {}
+    if not skip_baseline:
+        results["executemany (notebook)"] = _timed(lambda: pg_baseline(dfs, dsn), repeat)
+    results[f"COPY + pool ({workers} workers)"] = _timed(lambda: pg_copy(dfs, dsn, workers), repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--dsn", default=None, help="throwaway PostgreSQL database (tables are dropped)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-baseline", action="store_true", help="only time the COPY loader")
+    args = parser.parse_args(argv)
+
+    dsn, server = args.dsn, None
+    if dsn is None:
+        try:
+            import pgserver
+        except ImportError:
+            print("skipped: no PostgreSQL available (pass --dsn or pip install pgserver)")
+            return
+        try:
+            server = pgserver.get_server(tempfile.mkdtemp(prefix="pulse_pg_"), cleanup_mode="delete")
+        except Exception as e:  # e.g. initdb refuses to run as root
+            print(f"skipped: could not start a local PostgreSQL with pgserver ({e})")
+            return
+        dsn = server.get_uri()
+
+    dfs = {key: read_csv(key, args.data) for key in DATASETS}
+    total = sum(len(df) for df in dfs.values())
+    print(f"{total} rows across {len(dfs)} tables")
+    try:
+        results = run_postgres(dfs, dsn, args.repeat, args.workers, args.skip_baseline)
+    finally:
+        if server is not None:
+            server.cleanup()
+
+    print(f"target: postgresql (best of {args.repeat})")
+    for name, secs in results.items():
+        print(f"  {name:<50s} {secs:8.3f} s  {total / secs:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Benchmark: the ETL and dashboard data paths on synthetic Pulse data.
+
+For each scale, a synthetic JSON tree is generated (benchmarks/synth.py) in a
+temp directory and every stage below runs against it in order. Each stage feeds
+the next, as in production:
+
+    extract           pulse_extract.extract_all over the JSON tree
+    write_csv         the 12 CSVs
+    read_csv          all 12 CSVs with the registry dtypes (the dashboard's old load_all_csvs)
+    normalize_states  states.normalize_states over every State column
+    write_parquet     storage.write_parquet for every dataset
+    read_parquet      storage.read_datasets of the cube columns
+    write_arrow       the memory-mapped Arrow cache
+    read_arrow        storage.read_mapped of every dataset
+    state_cube        rollup.build_state_cube (the old aggregate_master_state merge)
+    type_cubes        rollup.build_type_cube for each TYPE_CUBES entry
+    slice_totals      slices.SliceIndex build + one all-period filter
+    scenario_queries  every backends.QUERIES view on the pandas backend
+    duckdb_queries    the same views on the DuckDB backend (skipped without duckdb)
+    drilldown         drilldown.build_drilldown
+    growth_districts  growth.GrowthMatrix over one district metric + summary
+    snapshots         snapshots.build_and_save (every query x year range)
+
+--stages picks a subset; the stages it depends on (STAGE_DEPS) are added.
+
+Time is the best of --repeat runs. Memory is measured in one extra run under
+tracemalloc (the peak Python-heap and NumPy allocations of the stage; Arrow's
+own buffers and worker processes are not seen). max_rss_so_far_bytes is the
+process' RSS high-water mark after the stage: cumulative over every stage run
+before it, so it only shows when a stage raised the peak. Results go to a JSON
+file; --compare prints the ratios to an earlier one. Everything runs offline.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--scales 1,10,100] [--repeat 3] [--out FILE] [--compare OLD.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import drilldown  # noqa: E402
+import rollup  # noqa: E402
+import snapshots  # noqa: E402
+import synth  # noqa: E402
+from backends import QUERIES, get_backend  # noqa: E402
+from datasets import DATASETS, csv_path, read_csv  # noqa: E402
+from growth import GrowthMatrix, load_district_metric  # noqa: E402
+from pulse_extract import extract_all, write_csvs  # noqa: E402
+from slices import SliceIndex  # noqa: E402
+from states import normalize_states  # noqa: E402
+from storage import read_datasets, read_mapped, write_arrow, write_parquet  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# -----------------------------
+# Stages: name -> fn(ctx); ctx holds the temp paths and the previous stages' outputs
+# -----------------------------
+def _scenario_queries(name):
+    def run(ctx):
+        backend = get_backend(name, data_dir=ctx["data"])
+        return {q: backend.query(q) for q in QUERIES}
+    return run
+
+def _duckdb_available():
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+STAGES = {
+    "extract": lambda ctx: extract_all(ctx["tree"], workers=ctx["workers"]),
+    "write_csv": lambda ctx: write_csvs(ctx["extract"], ctx["data"]),
+    "read_csv": lambda ctx: {k: read_csv(k, ctx["data"]) for k in DATASETS},
+    "normalize_states": lambda ctx: {k: normalize_states(df["State"]) for k, df in ctx["read_csv"].items()},
+    "write_parquet": lambda ctx: [write_parquet(k, df, ctx["data"]) for k, df in ctx["read_csv"].items()],
+    "read_parquet": lambda ctx: read_datasets(rollup.required_columns(), ctx["data"]),
+    "write_arrow": lambda ctx: [write_arrow(k, ctx["data"]) for k in DATASETS],
+    "read_arrow": lambda ctx: {k: read_mapped(k, data_dir=ctx["data"]) for k in DATASETS},
+    "state_cube": lambda ctx: rollup.build_state_cube(ctx["read_parquet"]),
+    "type_cubes": lambda ctx: {n: rollup.build_type_cube(ctx["read_parquet"], n) for n in rollup.TYPE_CUBES},
+    "slice_totals": lambda ctx: SliceIndex(ctx["state_cube"], list(rollup.METRICS)).totals(0, 9999, (1, 2, 3, 4)),
+    "scenario_queries": _scenario_queries("pandas"),
+    "duckdb_queries": _scenario_queries("duckdb"),
+    "drilldown": lambda ctx: drilldown.build_drilldown(read_datasets(drilldown.required_columns(), ctx["data"])),
+    "growth_districts": lambda ctx: GrowthMatrix.from_frame(
+        load_district_metric("transaction_amount", ctx["data"]), "entity", "value").summary(2024, 4),
+    "snapshots": lambda ctx: snapshots.build_and_save(ctx["data"]),
+}
+
+# stage -> the stages whose output (in ctx or in the data directory) it reads
+STAGE_DEPS = {
+    "extract": [],
+    "write_csv": ["extract"],
+    "read_csv": ["write_csv"],
+    "normalize_states": ["read_csv"],
+    "write_parquet": ["read_csv"],
+    "read_parquet": ["write_parquet"],
+    "write_arrow": ["write_csv"],
+    "read_arrow": ["write_arrow"],
+    "state_cube": ["read_parquet"],
+    "type_cubes": ["read_parquet"],
+    "slice_totals": ["state_cube"],
+    "scenario_queries": ["write_csv"],
+    "duckdb_queries": ["write_csv"],
+    "drilldown": ["write_csv"],
+    "growth_districts": ["write_csv"],
+    "snapshots": ["write_csv"],
+}
+
+def with_dependencies(stages):
+    """stages plus every stage they depend on, transitively, in STAGES order."""
+    needed, todo = set(), list(stages)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(STAGE_DEPS[name])
+    return [s for s in STAGES if s in needed]
+
+
+def _max_rss():
+    """Max resident set size of this process so far, in bytes (ru_maxrss is KB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def run_stage(fn, ctx, repeat, memory):
+    """(result, {seconds, peak_bytes, max_rss_so_far_bytes}) for one stage."""
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(ctx)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    stats = {"seconds": round(best, 6)}
+    if memory:
+        tracemalloc.start()
+        try:
+            fn(ctx)
+            stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    stats["max_rss_so_far_bytes"] = _max_rss()
+    return result, stats
+
+def run_scale(scale, stages, repeat=1, memory=True, workers=None, seed=0, keep=None):
+    """Generate the data at `scale` and run `stages`; returns the scale's results dict."""
+    tmp = keep or tempfile.mkdtemp(prefix=f"pulse_bench_{scale}x_")
+    ctx = {"tree": os.path.join(tmp, "pulse"), "data": os.path.join(tmp, "data"), "workers": workers}
+    try:
+        t0 = time.perf_counter()
+        files = synth.generate_tree(ctx["tree"], scale, seed)
+        out = {"json_files": files, "generate_seconds": round(time.perf_counter() - t0, 3), "stages": {}}
+        for name in stages:
+            ctx[name], stats = run_stage(STAGES[name], ctx, repeat, memory)
+            out["stages"][name] = stats
+            print(f"  {scale:>4}x  {name:<18s} {stats['seconds']:9.3f} s"
+                  + (f"  peak {stats['peak_bytes'] / 2**20:9.1f} MiB" if "peak_bytes" in stats else ""), flush=True)
+        out["rows"] = {k: len(df) for k, df in ctx["extract"].items()} if "extract" in ctx else {}
+        out["csv_bytes"] = sum(os.path.getsize(csv_path(k, ctx["data"])) for k in DATASETS
+                               if os.path.exists(csv_path(k, ctx["data"])))
+        return out
+    finally:
+        if keep is None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def environment():
+    """Machine and library versions, so results from different boxes are not compared blindly."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def compare(new, old):
+    """Print new/old time and peak-memory ratios per scale and stage (< 1 is better)."""
+    for scale, res in new["scales"].items():
+        base = old["scales"].get(scale)
+        if base is None:
+            continue
+        print(f"scale {scale}x vs {old['environment'].get('commit') or old['environment']['timestamp']}:")
+        for name, stats in res["stages"].items():
+            prev = base["stages"].get(name)
+            if not prev:
+                continue
+            line = f"  {name:<18s} time x{stats['seconds'] / max(prev['seconds'], 1e-9):6.2f}"
+            if "peak_bytes" in stats and prev.get("peak_bytes"):
+                line += f"   peak x{stats['peak_bytes'] / prev['peak_bytes']:6.2f}"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1,10", help="comma-separated scale factors, e.g. 1,10,100")
+    parser.add_argument("--stages", default=None, help=f"comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of each stage")
+    parser.add_argument("--workers", type=int, default=None, help="extraction worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", default=None, help="generate into this directory and keep it")
+    parser.add_argument("--out", default=None, help="results JSON (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    stages = args.stages.split(",") if args.stages else list(STAGES)
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    if "duckdb_queries" in stages and not _duckdb_available():
+        stages.remove("duckdb_queries")
+    # later stages read what earlier ones wrote, so they always run in STAGES order
+    added = [s for s in with_dependencies(stages) if s not in stages]
+    if added:
+        print(f"also running the stages they depend on: {', '.join(added)}")
+    stages = with_dependencies(stages)
+
+    results = {"environment": environment(), "repeat": args.repeat, "scales": {}}
+    for scale in (int(s) for s in args.scales.split(",")):
+        keep = os.path.join(args.keep, f"{scale}x") if args.keep else None
+        results["scales"][str(scale)] = run_scale(scale, stages, args.repeat, not args.no_memory,
+                                                  args.workers, args.seed, keep)
+
+    out = args.out or os.path.join(RESULTS_DIR, results["environment"]["timestamp"].replace(":", "") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=1)
+    print(f"results: {out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Synthetic PhonePe Pulse data at a chosen scale, for the benchmarks.
+
+Writes a JSON tree with the Pulse layout and document schemas that
+pulse_extract.py parses:
+
+    <out>/aggregated/{transaction,user,insurance}/country/india/state/<slug>/<year>/<q>.json
+    <out>/map/{transaction,user,insurance}/hover/country/india/state/<slug>/<year>/<q>.json
+    <out>/top/{transaction,user,insurance}/country/india/state/<slug>/<year>/<q>.json
+
+At scale 1 the shape matches the published data: the 36 states of
+states.STATE_NAMES, 2018-2024, 5 transaction types, 11 device brands per
+quarter (brand data ends in 2022 Q1), insurance from 2020 Q2, about 24
+districts per state and a top 10 of districts and pincodes. At scale N every
+per-quarter entity list (types, brands, districts, top lists) is N times
+longer, so each of the 12 datasets has about N times the rows. States and
+periods stay real, so the dashboard paths see the same keys. Output is
+deterministic for a given scale and seed.
+
+Usage:
+    python benchmarks/synth.py OUT [--scale 10] [--seed 0] [--csv DATA_DIR]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pulse_extract import STATE_SUBPATH  # noqa: E402
+from states import STATE_NAMES  # noqa: E402
+
+YEARS = range(2018, 2025)
+TRANSACTION_TYPES = ["Recharge & bill payments", "Peer-to-peer payments", "Merchant payments",
+                     "Financial Services", "Others"]
+BRANDS = ["Xiaomi", "Samsung", "Vivo", "Oppo", "OnePlus", "Realme", "Apple", "Motorola",
+          "Lenovo", "Huawei", "Others"]
+INSURANCE_TYPES = ["Insurance"]
+TOP_N = 10
+
+# first / last (year, quarter) with data, where Pulse does not cover every period
+INSURANCE_FROM = (2020, 2)
+BRANDS_UNTIL = (2022, 1)
+
+
+def _names(base, scale):
+    """base, then 'name 2', 'name 3', ... so that every name stays unique within a quarter."""
+    return [name if k == 0 else f"{name} {k + 1}" for k in range(scale) for name in base]
+
+def _amounts(rng, n, growth):
+    """(counts, amounts) for n entities: heavy-tailed counts, amount = count x ticket size."""
+    counts = np.maximum(1, rng.lognormal(8, 2, n) * growth).astype("int64")
+    return counts, counts * rng.uniform(200, 3000, n)
+
+
+class StateProfile:
+    """Entity names of one synthetic state at a scale."""
+
+    def __init__(self, index, rng, scale):
+        n_districts = int(rng.integers(4, 44)) * scale
+        self.districts = [f"district {k + 1}" for k in range(n_districts)]
+        self.top_districts = self.districts[:TOP_N * scale]
+        self.pincodes = [str(100000 + index * 10000 + k) for k in range(TOP_N * scale)]
+        self.types = _names(TRANSACTION_TYPES, scale)
+        self.brands = _names(BRANDS, scale)
+        self.insurance_types = _names(INSURANCE_TYPES, scale)
+
+
+# -----------------------------
+# Documents: one builder per Pulse section, mirroring pulse_extract.SOURCES
+# -----------------------------
+def _payment_list(names, counts, amounts):
+    return [{"name": n, "paymentInstruments": [{"type": "TOTAL", "count": int(c), "amount": float(a)}]}
+            for n, c, a in zip(names, counts, amounts)]
+
+def _hover_list(names, counts, amounts):
+    return [{"name": f"{n} district", "metric": [{"type": "TOTAL", "count": int(c), "amount": float(a)}]}
+            for n, c, a in zip(names, counts, amounts)]
+
+def _top_metric(names, counts, amounts):
+    order = np.argsort(-amounts)
+    return [{"entityName": names[i], "metric": {"type": "TOTAL", "count": int(counts[i]), "amount": float(amounts[i])}}
+            for i in order]
+
+def _top_users(names, counts):
+    return [{"name": names[i], "registeredUsers": int(counts[i])} for i in np.argsort(-counts)]
+
+def documents(profile, rng, year, quarter):
+    """{section: JSON document} for one state and quarter."""
+    growth = 1.15 ** ((year - YEARS[0]) * 4 + quarter - 1)
+    docs = {}
+    docs[os.path.join("aggregated", "transaction")] = {
+        "data": {"transactionData": _payment_list(profile.types, *_amounts(rng, len(profile.types), growth))}}
+    if (year, quarter) <= BRANDS_UNTIL:
+        counts = _amounts(rng, len(profile.brands), growth)[0]
+        by_device = [{"brand": b, "count": int(c), "percentage": float(c / counts.sum())}
+                     for b, c in zip(profile.brands, counts)]
+    else:
+        by_device = None
+    docs[os.path.join("aggregated", "user")] = {"data": {"usersByDevice": by_device}}
+    docs[os.path.join("map", "transaction", "hover")] = {
+        "data": {"hoverDataList": _hover_list(profile.districts, *_amounts(rng, len(profile.districts), growth))}}
+    users, opens = _amounts(rng, len(profile.districts), growth)
+    docs[os.path.join("map", "user", "hover")] = {"data": {"hoverData": {
+        f"{d} district": {"registeredUsers": int(u), "appOpens": int(o)}
+        for d, u, o in zip(profile.districts, users, opens.astype("int64"))}}}
+    docs[os.path.join("top", "transaction")] = {"data": {
+        "districts": _top_metric(profile.top_districts, *_amounts(rng, len(profile.top_districts), growth)),
+        "pincodes": _top_metric(profile.pincodes, *_amounts(rng, len(profile.pincodes), growth))}}
+    docs[os.path.join("top", "user")] = {"data": {
+        "districts": _top_users(profile.top_districts, _amounts(rng, len(profile.top_districts), growth)[0]),
+        "pincodes": _top_users(profile.pincodes, _amounts(rng, len(profile.pincodes), growth)[0])}}
+    if (year, quarter) >= INSURANCE_FROM:
+        small = growth / 1000
+        docs[os.path.join("aggregated", "insurance")] = {
+            "data": {"transactionData": _payment_list(profile.insurance_types,
+                                                      *_amounts(rng, len(profile.insurance_types), small))}}
+        docs[os.path.join("map", "insurance", "hover")] = {
+            "data": {"hoverDataList": _hover_list(profile.districts, *_amounts(rng, len(profile.districts), small))}}
+        docs[os.path.join("top", "insurance")] = {"data": {
+            "districts": _top_metric(profile.top_districts, *_amounts(rng, len(profile.top_districts), small)),
+            "pincodes": _top_metric(profile.pincodes, *_amounts(rng, len(profile.pincodes), small))}}
+    return docs
+
+
+def generate_tree(out, scale=1, seed=0):
+    """Write the synthetic JSON tree under `out`; returns the number of files written."""
+    rng = np.random.default_rng(seed)
+    files = 0
+    for index, slug in enumerate(sorted(STATE_NAMES)):
+        profile = StateProfile(index, rng, scale)
+        for year in YEARS:
+            for quarter in range(1, 5):
+                for section, doc in documents(profile, rng, year, quarter).items():
+                    d = os.path.join(out, section, STATE_SUBPATH, slug, str(year))
+                    os.makedirs(d, exist_ok=True)
+                    with open(os.path.join(d, f"{quarter}.json"), "w", encoding="utf-8") as f:
+                        json.dump({"success": True, "code": "SUCCESS", "data": doc["data"]}, f)
+                    files += 1
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Pulse JSON tree (and optionally the 12 CSVs).")
+    parser.add_argument("out", help="directory for the JSON tree")
+    parser.add_argument("--scale", type=int, default=1, help="entity multiplier (1 = the published data's size)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", default=None, help="also extract the tree into CSVs in this directory")
+    args = parser.parse_args(argv)
+
+    files = generate_tree(args.out, args.scale, args.seed)
+    print(f"{args.out}: {files} JSON files (scale {args.scale})")
+    if args.csv:
+        from pulse_extract import extract_all, write_csvs
+        dfs = extract_all(args.out)
+        write_csvs(dfs, args.csv)
+        print(f"{args.csv}: {sum(len(df) for df in dfs.values())} rows across {len(dfs)} CSVs")
+
+
+if __name__ == "__main__":
+    main()
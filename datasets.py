@@ -0,0 +1,220 @@
+"""Registry of the 12 PhonePe Pulse datasets.
+
+Shared by the extractor, the database loader and the Streamlit dashboard so the
+file names, table names and column types are defined in one place.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("PULSE_DATA_DIR", os.path.join(BASE_DIR, "data"))
+CACHE_SUBDIR = "cache"
+
+# "entity" is the column that identifies one row within a (State, Year, Quater)
+# partition; it must be unique there.
+#
+# Column type codes:
+#   "str"   -> Python str
+#   "int"   -> 64-bit integer
+#   "float" -> 64-bit float
+#   "Int64" -> nullable integer (some Pulse pincodes are null)
+DATASETS = {
+    "agg_trans": {
+        "csv": "Avg_trans.csv",
+        "table": "Agg_Trans",
+        "entity": "Transaction_type",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "Transaction_type": "str", "Transaction_count": "int", "Transaction_amount": "float"},
+    },
+    "agg_user": {
+        "csv": "Avg_user.csv",
+        "table": "Agg_User",
+        "entity": "Brand",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "Brand": "str", "Brand_count": "int", "Brand_percentage": "float"},
+    },
+    "agg_ins": {
+        "csv": "Avg_Insurance.csv",
+        "table": "Agg_Insurance",
+        "entity": "Insurance_type",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "Insurance_type": "str", "Insurance_count": "int", "Insurance_amount": "float"},
+    },
+    "map_trans": {
+        "csv": "Map_Trans.csv",
+        "table": "Map_Trans",
+        "entity": "District",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "District": "str", "count": "int", "amount": "float"},
+    },
+    "map_user": {
+        "csv": "Map_user.csv",
+        "table": "Map_user",
+        "entity": "District",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "District": "str", "Registered_users": "int", "App_opens": "int"},
+    },
+    "map_ins": {
+        "csv": "Map_Insurance.csv",
+        "table": "Map_Insurance",
+        "entity": "District",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "District": "str", "Insurance_count": "int", "Insurance_amount": "float"},
+    },
+    "top_tx_dist": {
+        "csv": "Top_Transaction_District.csv",
+        "table": "Top_Transaction_District",
+        "entity": "District",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "District": "str", "D_Count": "int", "D_Amount": "float"},
+    },
+    "top_tx_pin": {
+        "csv": "Top_Transaction_Pincode.csv",
+        "table": "Top_Transaction_Pincode",
+        "entity": "Pincode",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "Pincode": "Int64", "P_Count": "int", "P_Amount": "float"},
+    },
+    "top_user_dist": {
+        "csv": "Top_user_District.csv",
+        "table": "Top_user_District",
+        "entity": "District",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "District": "str", "Registeredusers_D": "int"},
+    },
+    "top_user_pin": {
+        "csv": "Top_user_Pincode.csv",
+        "table": "Top_user_Pincode",
+        "entity": "Pincode",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "Pincode": "Int64", "Registeredusers_P": "int"},
+    },
+    "top_ins_dist": {
+        "csv": "Top_insurance_District.csv",
+        "table": "Top_insurance_District",
+        "entity": "District",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "District": "str", "D_Count": "int", "D_Amount": "float"},
+    },
+    "top_ins_pin": {
+        "csv": "Top_insurance_Pincode.csv",
+        "table": "Top_insurance_Pincode",
+        "entity": "Pincode",
+        "columns": {"State": "str", "Year": "int", "Quater": "int",
+                    "Pincode": "Int64", "P_Count": "int", "P_Amount": "float"},
+    },
+}
+
+# Columns every dataset is partitioned by
+PARTITION_COLS = ["State", "Year", "Quater"]
+
+_PANDAS_DTYPES = {"str": "object", "int": "int64", "float": "float64", "Int64": "Int64"}
+
+
+def entity_key(key):
+    """Columns that uniquely identify a row of a dataset."""
+    return PARTITION_COLS + [DATASETS[key]["entity"]]
+
+
+def pandas_dtypes(key):
+    """Dict of column -> pandas dtype for a dataset, for read_csv(dtype=...)."""
+    return {c: _PANDAS_DTYPES[k] for c, k in DATASETS[key]["columns"].items()}
+
+
+def csv_path(key, data_dir=None):
+    """Absolute path of the CSV file for a dataset key."""
+    return os.path.join(data_dir or DATA_DIR, DATASETS[key]["csv"])
+
+
+def csv_paths(data_dir=None):
+    """Dict of dataset key -> CSV path, in the same shape as Streamlit's CSV_PATHS."""
+    return {k: csv_path(k, data_dir) for k in DATASETS}
+
+
+def read_csv(key, data_dir=None, **kwargs):
+    """Read one dataset CSV with the registry dtypes; missing file -> empty typed DataFrame."""
+    p = csv_path(key, data_dir)
+    dtypes = pandas_dtypes(key)
+    if not os.path.exists(p):
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in dtypes.items()})
+    return pd.read_csv(p, dtype=dtypes, float_precision='round_trip', **kwargs)
+
+
+def data_version(data_dir=None):
+    """
+    Short hash identifying the current contents of the 12 CSVs (name, size, mtime).
+    Derived artifacts (rollups, caches) are keyed by it and rebuilt when it changes.
+    """
+    h = hashlib.sha1()
+    for key in DATASETS:
+        p = csv_path(key, data_dir)
+        if os.path.exists(p):
+            st = os.stat(p)
+            h.update(f"{DATASETS[key]['csv']}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()[:12]
+
+
+def cache_dir(data_dir=None):
+    """Directory for derived artifacts (rollups, caches); created on demand."""
+    d = os.path.join(data_dir or DATA_DIR, CACHE_SUBDIR)
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+# -----------------------------
+# Versioned cache entries
+# -----------------------------
+# Derived artifacts are named <prefix><data version>... under cache_dir(). They are
+# written under a "tmp-" name and moved into place, so readers in other processes
+# never see a partial entry, and entries for older versions are dropped afterwards.
+def replace_file(path, write):
+    """Call write(tmp) on a temp path next to `path`, then atomically replace `path` with it."""
+    tmp = os.path.join(os.path.dirname(path), f"tmp-{os.getpid()}-{threading.get_ident()}-{os.path.basename(path)}")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+def publish_dir(path, write):
+    """
+    Call write(tmp) on a new temp directory next to `path`, then rename it to `path`.
+    If another process published `path` first, that copy is kept and this one discarded.
+    """
+    tmp = tempfile.mkdtemp(prefix="tmp-", dir=os.path.dirname(path))
+    try:
+        write(tmp)
+        if not os.path.isdir(path):
+            os.chmod(tmp, 0o755)  # mkdtemp creates it private to this user
+            try:
+                os.rename(tmp, path)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+def drop_old_versions(prefix, keep, data_dir=None):
+    """Remove the cache entries named prefix* other than `keep`; returns the removed paths."""
+    removed = []
+    for name in os.listdir(cache_dir(data_dir)):
+        old = os.path.join(cache_dir(data_dir), name)
+        if not name.startswith(prefix) or old == keep:
+            continue
+        if os.path.isdir(old):
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            try:
+                os.remove(old)
+            except FileNotFoundError:  # another process dropped it first
+                continue
+        removed.append(old)
+    return removed
@@ -0,0 +1,148 @@
+"""Bulk-load the 12 Pulse datasets into PostgreSQL.
+
+Table and column definitions come from datasets.py, so they match the
+CREATE TABLE statements the notebook used. Each DataFrame is streamed through
+COPY FROM STDIN from an in-memory CSV buffer (no per-row round-trips, no
+.values.tolist() copy). Tables are loaded in parallel over a shared connection
+pool, and the (State, Year, Quater) and (Year, Quater, State) indexes are built
+after the bulk load.
+
+A full load truncates each table first, and an incremental load replaces whole
+(State, Year, Quater) partitions, so re-running never duplicates rows. Every
+load ends by writing a new load version to the Pulse_Meta table; the dashboard
+keys its cached results on it (backends.PostgresBackend.version).
+
+Usage:
+    python db_load.py data --dsn "host=localhost dbname=project user=postgres"
+"""
+import argparse
+import datetime
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from datasets import DATASETS, DATA_DIR, PARTITION_COLS, read_csv
+
+DEFAULT_DSN = "host=localhost dbname=project port=5432 user=postgres sslmode=prefer"
+
+_SQL_TYPES = {"str": "VARCHAR(255)", "int": "BIGINT", "float": "FLOAT", "Int64": "INT"}
+
+# index kind -> columns. "partition" serves partition replacement and per-state
+# lookups; "period" serves the dashboard's year/quarter filters (backends.py).
+INDEXES = {
+    "partition": PARTITION_COLS,
+    "period": ["Year", "Quater", "State"],
+}
+
+META_TABLE = "Pulse_Meta"
+LOAD_VERSION_KEY = "load_version"
+
+
+def resolve_dsn(dsn=None):
+    """PULSE_PG_DSN (or the libpq PG* variables) override the default."""
+    return dsn or os.environ.get("PULSE_PG_DSN", DEFAULT_DSN)
+
+def connect(dsn=None):
+    return psycopg2.connect(resolve_dsn(dsn))
+
+def create_pool(dsn=None, maxconn=4):
+    return ThreadedConnectionPool(1, maxconn, resolve_dsn(dsn))
+
+def create_table_sql(key):
+    spec = DATASETS[key]
+    cols = ",\n        ".join(f"{c} {_SQL_TYPES[t]}" for c, t in spec["columns"].items())
+    return f"CREATE TABLE IF NOT EXISTS {spec['table']} (\n        {cols}\n    )"
+
+def index_name(key, kind="partition"):
+    return f"{DATASETS[key]['table'].lower()}_{kind}_idx"
+
+def create_index_sql(key, kind="partition"):
+    return f"CREATE INDEX IF NOT EXISTS {index_name(key, kind)} ON {DATASETS[key]['table']} ({', '.join(INDEXES[kind])})"
+
+def copy_rows(cursor, key, df):
+    """Stream df into the table with COPY FROM STDIN. Empty fields (NaN/NA) load as NULL."""
+    if df.empty:
+        return
+    spec = DATASETS[key]
+    cols = list(spec["columns"])
+    buf = io.StringIO()
+    df.to_csv(buf, columns=cols, index=False, header=False)
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {spec['table']} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+def replace_table(conn, key, df):
+    """
+    Create the table if needed, empty it and bulk-load df, in one transaction.
+    The indexes are dropped during the COPY and rebuilt afterwards.
+    """
+    with conn, conn.cursor() as cursor:
+        cursor.execute(create_table_sql(key))
+        for kind in INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {index_name(key, kind)}")
+        cursor.execute(f"TRUNCATE {DATASETS[key]['table']}")
+        copy_rows(cursor, key, df)
+        for kind in INDEXES:
+            cursor.execute(create_index_sql(key, kind))
+
+def replace_partitions(conn, key, df, partitions):
+    """Delete the given (State, Year, Quater) partitions and COPY df in their place."""
+    partitions = [tuple(p) for p in partitions]
+    with conn, conn.cursor() as cursor:
+        cursor.execute(create_table_sql(key))
+        for kind in INDEXES:
+            cursor.execute(create_index_sql(key, kind))
+        if partitions:
+            cursor.execute(
+                f"DELETE FROM {DATASETS[key]['table']} WHERE ({', '.join(PARTITION_COLS)}) IN %s",
+                (tuple(partitions),))
+        copy_rows(cursor, key, df)
+
+def stamp_load(conn):
+    """Write a new load version (the load time) to META_TABLE; returns it."""
+    version = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="microseconds")
+    with conn, conn.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key VARCHAR(64) PRIMARY KEY, value VARCHAR(255))")
+        cursor.execute(f"INSERT INTO {META_TABLE} (key, value) VALUES (%s, %s) "
+                       "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value", (LOAD_VERSION_KEY, version))
+    return version
+
+def _with_pooled_conn(pool, fn, *args):
+    conn = pool.getconn()
+    try:
+        return fn(conn, *args)
+    finally:
+        pool.putconn(conn)
+
+def load_all(dfs, dsn=None, workers=4, pool=None):
+    """Full reload of every dataset in dfs, `workers` tables at a time."""
+    own_pool = pool is None
+    pool = pool or create_pool(dsn, maxconn=workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [ex.submit(_with_pooled_conn, pool, replace_table, key, df) for key, df in dfs.items()]
+            for f in futures:
+                f.result()
+        _with_pooled_conn(pool, stamp_load)
+    finally:
+        if own_pool:
+            pool.closeall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the Pulse CSVs into PostgreSQL.")
+    parser.add_argument("data_dir", nargs="?", default=DATA_DIR)
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: PULSE_PG_DSN)")
+    parser.add_argument("--workers", type=int, default=4, help="tables loaded in parallel")
+    args = parser.parse_args(argv)
+
+    dfs = {key: read_csv(key, args.data_dir) for key in DATASETS}
+    load_all(dfs, args.dsn, args.workers)
+    for key, df in dfs.items():
+        print(f"{DATASETS[key]['table']}: {len(df)} rows")
+
+
+if __name__ == "__main__":
+    main()
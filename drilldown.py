@@ -0,0 +1,166 @@
+"""District / pincode drill-down indexes for the dashboard.
+
+For every state, the district values (Map_* tables, all districts) and the top
+pincodes (Top_*_Pincode tables) of each (year, quarter) are precomputed once per
+data refresh in long form, ranked within their period and written one file per
+state under data/cache/drilldown-<version>/. The dashboard reads only the
+selected state's file and answers a period lookup from a DrillIndex, so the
+full pincode tables never reach a page.
+
+Usage:
+    python drilldown.py [data_dir]
+"""
+import argparse
+import os
+
+import pandas as pd
+
+from datasets import PARTITION_COLS, cache_dir, data_version, drop_old_versions, publish_dir
+from profiling import timed
+from states import canonical_key, normalize_state_col
+from storage import pyarrow, read_datasets
+
+# Pincodes kept per (state, year, quarter, metric); Pulse publishes 10
+TOP_N = 10
+
+# category -> level -> (dataset key, entity column, {metric: source column})
+DRILL_SOURCES = {
+    "Transactions": {
+        "district": ("map_trans", "District", {"transaction_amount": "amount", "transaction_count": "count"}),
+        "pincode": ("top_tx_pin", "Pincode", {"transaction_amount": "P_Amount", "transaction_count": "P_Count"}),
+    },
+    "Users": {
+        "district": ("map_user", "District", {"registered_users": "Registered_users", "app_opens": "App_opens"}),
+        "pincode": ("top_user_pin", "Pincode", {"registered_users": "Registeredusers_P"}),
+    },
+    "Insurance": {
+        "district": ("map_ins", "District", {"insurance_amount": "Insurance_amount", "insurance_count": "Insurance_count"}),
+        "pincode": ("top_ins_pin", "Pincode", {"insurance_amount": "P_Amount", "insurance_count": "P_Count"}),
+    },
+}
+
+INDEX_COLS = ["category", "level", "metric", "year", "quarter"]
+
+# Bump when DRILL_SOURCES or the file layout changes so persisted indexes are rebuilt
+DRILL_VERSION = 1
+
+
+def district_key(name):
+    """Match key for district names: 'South Andaman District' == 'south andaman'."""
+    key = canonical_key(name)
+    return key[:-len(" district")] if key.endswith(" district") else key
+
+def required_columns():
+    """{dataset key: columns to read} for building the indexes."""
+    cols = {}
+    for levels in DRILL_SOURCES.values():
+        for key, entity, metrics in levels.values():
+            cols[key] = PARTITION_COLS + [entity] + list(metrics.values())
+    return cols
+
+def build_drilldown(dfs):
+    """
+    Long table: state, category, level, metric, year, quarter, rank, entity, value.
+    Districts keep every row; pincodes keep the TOP_N per period. State names are normalized.
+    """
+    parts = []
+    for category, levels in DRILL_SOURCES.items():
+        for level, (key, entity, metrics) in levels.items():
+            df = dfs.get(key)
+            if df is None or df.empty:
+                continue
+            base = pd.DataFrame({
+                "state": df["State"].astype(str).to_numpy(),
+                "year": df["Year"].astype("int64").to_numpy(),
+                "quarter": df["Quater"].astype("int64").to_numpy(),
+                "entity": df[entity].astype("string").to_numpy(),
+            })
+            for metric, col in metrics.items():
+                part = base.assign(value=df[col].astype("float64").to_numpy()).dropna(subset=["entity"])
+                part = part.groupby(["state", "year", "quarter", "entity"], as_index=False, sort=False)["value"].sum()
+                part["rank"] = (part.groupby(["state", "year", "quarter"])["value"]
+                                .rank(method="first", ascending=False).astype("int32"))
+                if level == "pincode":
+                    part = part[part["rank"] <= TOP_N]
+                parts.append(part.assign(category=category, level=level, metric=metric))
+    cols = ["state"] + INDEX_COLS + ["rank", "entity", "value"]
+    if not parts:
+        return pd.DataFrame(columns=cols)
+    out = normalize_state_col(pd.concat(parts, ignore_index=True)[cols])
+    return out.sort_values(["state"] + INDEX_COLS + ["rank"], ignore_index=True)
+
+
+class DrillIndex:
+    """One state's drill-down rows, indexed by (category, level, metric, year, quarter)."""
+
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self._rows = self.frame.groupby(INDEX_COLS, sort=False).indices if len(self.frame) else {}
+        self.periods = sorted({(int(k[3]), int(k[4])) for k in self._rows})
+
+    def lookup(self, category, level, metric, year, quarter, n=None):
+        """entity, value, rank for one period, best first (top n when given)."""
+        rows = self._rows.get((category, level, metric, year, quarter))
+        if rows is None:
+            return pd.DataFrame(columns=["rank", "entity", "value"])
+        out = self.frame.iloc[rows][["rank", "entity", "value"]]
+        return out.head(n) if n else out
+
+
+# -----------------------------
+# Persistence
+# -----------------------------
+def drill_version(data_dir=None):
+    return f"{data_version(data_dir)}-v{DRILL_VERSION}"
+
+def drill_dir(data_dir=None, version=None):
+    return os.path.join(cache_dir(data_dir), f"drilldown-{version or drill_version(data_dir)}")
+
+def state_path(state, data_dir=None, version=None):
+    ext = "parquet" if pyarrow is not None else "csv"
+    return os.path.join(drill_dir(data_dir, version), f"{canonical_key(state).replace(' ', '-')}.{ext}")
+
+def build_and_save(data_dir=None):
+    """Build the indexes and write one file per state; returns the long table."""
+    dfs = read_datasets(required_columns(), data_dir)
+    table = build_drilldown(dfs)
+    version = drill_version(data_dir)
+    final = drill_dir(data_dir, version)
+
+    def write(tmp):
+        for state, rows in table.groupby("state", observed=True, sort=False):
+            path = os.path.join(tmp, os.path.basename(state_path(state, data_dir, version)))
+            rows = rows.drop(columns="state")
+            if path.endswith(".parquet"):
+                rows.to_parquet(path, index=False)
+            else:
+                rows.to_csv(path, index=False)
+    # written into a temp dir and renamed, so readers never see a partial index
+    publish_dir(final, write)
+    # drop indexes built from older data
+    drop_old_versions("drilldown-", final, data_dir)
+    return table
+
+@timed("load")
+def load_state(state, data_dir=None):
+    """One state's drill-down rows for the current data version; the indexes are built (once) if missing."""
+    if not os.path.isdir(drill_dir(data_dir)):
+        build_and_save(data_dir)
+    path = state_path(state, data_dir)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=INDEX_COLS + ["rank", "entity", "value"])
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={"entity": "string"})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the per-state district / pincode drill-down indexes.")
+    parser.add_argument("data_dir", nargs="?", default=None)
+    args = parser.parse_args(argv)
+    table = build_and_save(args.data_dir)
+    print(f"{drill_dir(args.data_dir)}: {table['state'].nunique()} states, {len(table)} rows")
+
+
+if __name__ == "__main__":
+    main()
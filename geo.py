@@ -0,0 +1,260 @@
+"""Local, pre-simplified India GeoJSON assets for the dashboard maps.
+
+`python geo.py` downloads (or reads) the source boundaries once and writes one
+simplified copy per detail level under geo/:
+
+    geo/india_states-<detail>.geojson
+    geo/india_districts-<detail>.geojson   (when --districts is given)
+    geo/manifest.json                      (source digests -> version key)
+
+Rings are simplified with Douglas-Peucker at the DETAIL_LEVELS tolerances,
+coordinates are rounded to COORD_DECIMALS and only the properties the maps use
+are kept (ST_NM, plus `district` for districts). The dashboard loads these files
+instead of fetching the full-resolution gist on every start.
+
+The state source is bundled as geo/source/india_states.geojson (see
+geo/source/README.md), so the assets can be rebuilt offline; STATES_URL is only
+fetched (with a timeout) when both the asset and the bundled source are missing.
+
+Usage:
+    python geo.py [--states URL_OR_PATH] [--districts URL_OR_PATH --district-key NAME_2 --district-state-key NAME_1]
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import requests
+
+from datasets import BASE_DIR
+from states import normalize_name
+
+GEO_DIR = os.path.join(BASE_DIR, "geo")
+
+# Bundled state boundaries (already keyed on ST_NM); the default build source
+STATES_SOURCE = os.path.join(GEO_DIR, "source", "india_states.geojson")
+
+STATES_URL = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+
+# detail level -> Douglas-Peucker tolerance in degrees (~1 km per 0.01)
+DETAIL_LEVELS = {"high": 0.002, "medium": 0.01, "low": 0.04}
+DEFAULT_DETAIL = "medium"
+
+COORD_DECIMALS = 4
+FETCH_TIMEOUT = 15  # seconds
+
+# Bump when the simplification or the asset layout changes
+GEO_FORMAT_VERSION = 1
+
+
+# -----------------------------
+# Simplification
+# -----------------------------
+def simplify_ring(points, tolerance):
+    """Douglas-Peucker on one closed ring. Returns an (n, 2) array, or None if it collapses below 4 points."""
+    pts = np.asarray(points, dtype="float64")[:, :2]
+    if tolerance <= 0 or len(pts) <= 4:
+        return pts
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        seg = pts[j] - pts[i]
+        rel = pts[i + 1:j] - pts[i]
+        norm = np.hypot(seg[0], seg[1])
+        if norm == 0:  # closed ring: the first split is on the farthest point
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / norm
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+    out = pts[keep]
+    return out if len(out) >= 4 else None
+
+def _round(ring):
+    return np.round(ring, COORD_DECIMALS).tolist()
+
+def simplify_polygon(rings, tolerance):
+    """Simplified [exterior, *holes]; collapsed holes are dropped. None if the exterior collapses."""
+    exterior = simplify_ring(rings[0], tolerance)
+    if exterior is None:
+        return None
+    holes = [h for h in (simplify_ring(r, tolerance) for r in rings[1:]) if h is not None]
+    return [_round(exterior)] + [_round(h) for h in holes]
+
+def simplify_geometry(geometry, tolerance):
+    """Polygon / MultiPolygon geometry simplified; islands that collapse are dropped, but never all of them."""
+    if geometry["type"] == "Polygon":
+        polys = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polys = geometry["coordinates"]
+    else:
+        return geometry
+    out = [p for p in (simplify_polygon(rings, tolerance) for rings in polys) if p is not None]
+    if not out:
+        # keep the largest part unsimplified so the feature stays on the map
+        largest = max(polys, key=lambda rings: len(rings[0]))
+        out = [[_round(np.asarray(r, dtype="float64")[:, :2]) for r in largest]]
+    if len(out) == 1:
+        return {"type": "Polygon", "coordinates": out[0]}
+    return {"type": "MultiPolygon", "coordinates": out}
+
+def simplify_collection(collection, tolerance, properties):
+    """
+    FeatureCollection with simplified geometries.
+    properties: feature -> dict of properties to keep.
+    """
+    features = []
+    for feat in collection["features"]:
+        if not feat.get("geometry"):
+            continue
+        features.append({"type": "Feature", "properties": properties(feat),
+                         "geometry": simplify_geometry(feat["geometry"], tolerance)})
+    return {"type": "FeatureCollection", "features": features}
+
+
+# -----------------------------
+# Assets
+# -----------------------------
+def asset_path(level="states", detail=DEFAULT_DETAIL, geo_dir=None):
+    return os.path.join(geo_dir or GEO_DIR, f"india_{level}-{detail}.geojson")
+
+def manifest_path(geo_dir=None):
+    return os.path.join(geo_dir or GEO_DIR, "manifest.json")
+
+def load_manifest(geo_dir=None):
+    path = manifest_path(geo_dir)
+    if not os.path.exists(path):
+        return {"format": GEO_FORMAT_VERSION, "layers": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def geo_version(geo_dir=None):
+    """Version key of the bundled assets (changes when a source or the format changes); None if not built."""
+    layers = load_manifest(geo_dir).get("layers", {})
+    if not layers:
+        return None
+    digest = hashlib.sha1(f"{GEO_FORMAT_VERSION}".encode())
+    for level in sorted(layers):
+        digest.update(f"{level}:{layers[level]['sha1']}".encode())
+    return digest.hexdigest()[:12]
+
+def read_source(src, timeout=FETCH_TIMEOUT):
+    """Raw bytes of a GeoJSON file from a path or an http(s) URL."""
+    if src.startswith(("http://", "https://")):
+        r = requests.get(src, timeout=timeout)
+        r.raise_for_status()
+        return r.content
+    with open(src, "rb") as f:
+        return f.read()
+
+def source_label(src):
+    """How a source is recorded in the manifest: URLs as given, local files relative to the repo."""
+    if src.startswith(("http://", "https://")):
+        return src
+    return os.path.relpath(os.path.abspath(src), BASE_DIR).replace(os.sep, "/")
+
+def _state_properties(key):
+    return lambda feat: {"ST_NM": normalize_name(feat["properties"][key])}
+
+def _district_properties(key, state_key):
+    return lambda feat: {"ST_NM": normalize_name(feat["properties"][state_key]),
+                         "district": str(feat["properties"][key]).strip()}
+
+def build_layer(raw, level, properties, source="", geo_dir=None, write=True):
+    """
+    Simplify one source layer at every detail level. Returns {detail: FeatureCollection};
+    with write=True the assets and the manifest entry are written under geo_dir.
+    """
+    geo_dir = geo_dir or GEO_DIR
+    collection = json.loads(raw)
+    out = {detail: simplify_collection(collection, tol, properties) for detail, tol in DETAIL_LEVELS.items()}
+    if write:
+        os.makedirs(geo_dir, exist_ok=True)
+        sizes = {}
+        for detail, fc in out.items():
+            path = asset_path(level, detail, geo_dir)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(fc, f, separators=(",", ":"))
+            sizes[detail] = os.path.getsize(path)
+        manifest = load_manifest(geo_dir)
+        manifest["format"] = GEO_FORMAT_VERSION
+        manifest.setdefault("layers", {})[level] = {
+            "source": source, "sha1": hashlib.sha1(raw).hexdigest(), "source_bytes": len(raw),
+            "features": len(collection["features"]), "tolerances": DETAIL_LEVELS, "bytes": sizes,
+        }
+        with open(manifest_path(geo_dir), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+    return out
+
+def pack_coordinates(collection):
+    """
+    Same FeatureCollection with every ring as a float64 numpy array. Plotly deep-copies
+    the geojson on each figure copy and validation; arrays copy as one block instead of
+    one list per coordinate pair, and serialize to the same JSON.
+    """
+    def pack(geometry):
+        if geometry["type"] == "Polygon":
+            coords = [np.asarray(r, dtype="float64") for r in geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            coords = [[np.asarray(r, dtype="float64") for r in p] for p in geometry["coordinates"]]
+        else:
+            return geometry
+        return {"type": geometry["type"], "coordinates": coords}
+    return {"type": "FeatureCollection",
+            "features": [dict(f, geometry=pack(f["geometry"])) for f in collection["features"]]}
+
+def load_geojson(level="states", detail=DEFAULT_DETAIL, geo_dir=None, fetch=True):
+    """
+    Bundled simplified GeoJSON for `level` at `detail`.
+    If the state asset is missing it is built once from STATES_SOURCE, or with
+    fetch=True from STATES_URL (network, FETCH_TIMEOUT) when that is missing too,
+    and written to geo_dir when that is writable.
+    """
+    path = asset_path(level, detail, geo_dir)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    if level != "states" or not (fetch or os.path.exists(STATES_SOURCE)):
+        raise FileNotFoundError(f"{path} not found; run `python geo.py` to build the map assets")
+    src = STATES_SOURCE if os.path.exists(STATES_SOURCE) else STATES_URL
+    raw = read_source(src)
+    try:
+        layers = build_layer(raw, level, _state_properties("ST_NM"), source_label(src), geo_dir)
+    except OSError:
+        layers = build_layer(raw, level, _state_properties("ST_NM"), source_label(src), geo_dir, write=False)
+    return layers[detail]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the simplified India GeoJSON assets under geo/.")
+    parser.add_argument("--states", default=STATES_SOURCE, help="state boundaries (path or URL; default: the bundled source)")
+    parser.add_argument("--state-key", default="ST_NM", help="state name property in --states")
+    parser.add_argument("--districts", default=None, help="district boundaries (path or URL)")
+    parser.add_argument("--district-key", default="district", help="district name property in --districts")
+    parser.add_argument("--district-state-key", default="st_nm", help="state name property in --districts")
+    parser.add_argument("--out", default=GEO_DIR)
+    args = parser.parse_args(argv)
+
+    layers = [("states", args.states, _state_properties(args.state_key))]
+    if args.districts:
+        layers.append(("districts", args.districts, _district_properties(args.district_key, args.district_state_key)))
+    for level, src, properties in layers:
+        raw = read_source(src)
+        build_layer(raw, level, properties, source_label(src), args.out)
+        for detail in DETAIL_LEVELS:
+            path = asset_path(level, detail, args.out)
+            print(f"{os.path.relpath(path, args.out)}: {len(raw) // 1024} KB -> {os.path.getsize(path) // 1024} KB")
+    print(f"version: {geo_version(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
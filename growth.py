@@ -0,0 +1,191 @@
+"""Growth analytics over (entity x quarter) matrices.
+
+A long table of (entity, year, quarter, value) rows is pivoted once into a dense
+float matrix with one row per entity (state, or state/district) and one column
+per quarter, with the quarters contiguous from the first to the last period in
+the data. Every measure is then a whole-matrix NumPy operation with no
+per-entity loop:
+
+    qoq / yoy        value / value shifted by 1 / 4 quarters - 1
+    rolling(w)       trailing w-quarter sums (cumulative-sum difference)
+    cagr             compound annual growth between the first and last complete year
+    ranks            per-quarter rank (1 = largest), rank_change over a lag
+
+Quarters with no row are NaN and propagate into the growth rates that touch them.
+At district granularity (~850 districts x 28 quarters) a full pivot plus summary
+takes well under 50 ms. The dashboard builds each (level, metric) matrix once
+(st.cache_resource) and only recomputes the per-quarter summaries on interaction.
+"""
+import numpy as np
+import pandas as pd
+
+from drilldown import DRILL_SOURCES, district_key
+from profiling import timed
+from slices import period_index
+from states import normalize_states
+from storage import read_dataset
+
+
+def _ratio(num, den):
+    """num / den - 1, NaN where den is 0 or either side is NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = num / den - 1
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+def _shift(matrix, lag):
+    """matrix shifted right by `lag` columns, NaN-filled."""
+    out = np.full_like(matrix, np.nan)
+    if lag < matrix.shape[1]:
+        out[:, lag:] = matrix[:, :-lag]
+    return out
+
+
+class GrowthMatrix:
+    """Entities x quarters value matrix with vectorized growth measures."""
+
+    def __init__(self, entities, periods, values):
+        self.entities = pd.Index(entities, name="entity")
+        self.periods = np.asarray(periods, dtype="int64")
+        self.values = np.asarray(values, dtype="float64")
+
+    @classmethod
+    @timed("aggregate")
+    def from_frame(cls, df, entity, value, year="year", quarter="quarter"):
+        """Pivot long rows into the matrix with one bincount; duplicate (entity, period) rows are summed."""
+        codes, entities = pd.factorize(df[entity].astype(str), sort=True)
+        periods = period_index(df[year].to_numpy(dtype="int64"), df[quarter].to_numpy(dtype="int64"))
+        if len(periods) == 0:
+            return cls([], [], np.empty((0, 0)))
+        first, last = periods.min(), periods.max()
+        n_e, n_p = len(entities), int(last - first + 1)
+        flat = codes * n_p + (periods - first)
+        weights = df[value].to_numpy(dtype="float64")
+        sums = np.bincount(flat, weights=np.nan_to_num(weights), minlength=n_e * n_p)
+        seen = np.bincount(flat, minlength=n_e * n_p) > 0
+        values = np.where(seen, sums, np.nan).reshape(n_e, n_p)
+        return cls(entities, np.arange(first, last + 1), values)
+
+    @property
+    def labels(self):
+        """Quarter labels like '2022-Q3'."""
+        return [f"{p // 4}-Q{p % 4 + 1}" for p in self.periods]
+
+    def column(self, year, quarter):
+        """Matrix column of a (year, quarter); KeyError if outside the data."""
+        col = int(period_index(year, quarter) - self.periods[0]) if len(self.periods) else -1
+        if not 0 <= col < len(self.periods):
+            raise KeyError((year, quarter))
+        return col
+
+    # -----------------------------
+    # Measures (each returns an entities x quarters matrix, except cagr)
+    # -----------------------------
+    def qoq(self):
+        return _ratio(self.values, _shift(self.values, 1))
+
+    def yoy(self):
+        return _ratio(self.values, _shift(self.values, 4))
+
+    def rolling(self, window=4):
+        """Trailing `window`-quarter sums; NaN until `window` quarters exist or when one of them is missing."""
+        def trailing(matrix):
+            csum = np.cumsum(matrix, axis=1)
+            prev = _shift(csum, window)
+            if window <= csum.shape[1]:
+                prev[:, window - 1] = 0
+            return csum - prev
+        out = trailing(np.nan_to_num(self.values))
+        out[trailing(np.isnan(self.values).astype("float64")) > 0] = np.nan
+        return out
+
+    def annual(self):
+        """(years, entities x years matrix) for the calendar years with all four quarters in the data."""
+        years = self.periods // 4
+        full = [y for y in np.unique(years) if (years == y).sum() == 4]
+        if not full:
+            return np.array([], dtype="int64"), np.empty((len(self.entities), 0))
+        cols = [np.where(years == y)[0] for y in full]
+        return np.asarray(full), np.stack([self.values[:, c].sum(axis=1) for c in cols], axis=1)
+
+    def cagr(self):
+        """Per-entity compound annual growth between the first and last complete year (NaN if < 2)."""
+        years, totals = self.annual()
+        if len(years) < 2:
+            return np.full(len(self.entities), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = (totals[:, -1] / totals[:, 0]) ** (1.0 / (years[-1] - years[0])) - 1
+        out[~np.isfinite(out)] = np.nan
+        return out
+
+    def ranks(self):
+        """
+        Per-quarter rank among the entities with a value that quarter, 1 = largest
+        (ties in entity order); NaN where the value is missing.
+        """
+        missing = np.isnan(self.values)
+        # missing values sort after every present one, so ranks 1..n go to the n present entities
+        order = np.lexsort((-np.nan_to_num(self.values, nan=0.0), missing), axis=0)
+        ranks = np.empty(self.values.shape, dtype="float64")
+        np.put_along_axis(ranks, order, np.arange(1, len(self.entities) + 1, dtype="float64")[:, None], axis=0)
+        ranks[missing] = np.nan
+        return ranks
+
+    def rank_change(self, lag=4):
+        """Places gained over `lag` quarters (positive = moved up); NaN unless both quarters have a rank."""
+        ranks = self.ranks()
+        return _shift(ranks, lag) - ranks
+
+    @timed("aggregate")
+    def summary(self, year, quarter, window=4):
+        """One row per entity at (year, quarter): value, qoq, yoy, rolling sum, rank, rank changes, cagr."""
+        col = self.column(year, quarter)
+        ranks = self.ranks()
+        return pd.DataFrame({
+            "value": self.values[:, col],
+            "qoq": self.qoq()[:, col],
+            "yoy": self.yoy()[:, col],
+            f"rolling_{window}q": self.rolling(window)[:, col],
+            "rank": ranks[:, col],
+            "rank_change_qoq": self.rank_change(1)[:, col],
+            "rank_change_yoy": self.rank_change(4)[:, col],
+            "cagr": self.cagr(),
+        }, index=self.entities).reset_index()
+
+    def to_long(self, matrix, name="value", entities=None):
+        """entity, period, <name> rows of a measure matrix (for charts), optionally for a subset of entities."""
+        rows = np.arange(len(self.entities)) if entities is None else self.entities.get_indexer(entities)
+        rows = rows[rows >= 0]
+        return pd.DataFrame({
+            "entity": np.repeat(self.entities[rows].to_numpy(), len(self.periods)),
+            "period": np.tile(self.labels, len(rows)),
+            name: matrix[rows].ravel(),
+        })
+
+
+def district_metrics():
+    """{metric: (dataset key, source column)} available per district (the Map_* tables)."""
+    out = {}
+    for levels in DRILL_SOURCES.values():
+        key, _, metrics = levels["district"]
+        out.update({metric: (key, col) for metric, col in metrics.items()})
+    return out
+
+@timed("load")
+def load_district_metric(metric, data_dir=None):
+    """entity ('State / District'), year, quarter, value rows of one district metric, reading only those columns."""
+    key, col = district_metrics()[metric]
+    df = read_dataset(key, columns=["State", "Year", "Quater", "District", col], data_dir=data_dir, prefer="arrow")
+    if df.empty:
+        return pd.DataFrame(columns=["entity", "year", "quarter", "value"])
+    # name each distinct state/district once, then broadcast through the codes
+    pairs = df[["State", "District"]].astype(str)
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(pairs))
+    states = normalize_states(pd.Series(uniques.get_level_values(0)))
+    names = [f"{s} / {district_key(d).title()}" for s, d in zip(states, uniques.get_level_values(1))]
+    return pd.DataFrame({
+        "entity": np.asarray(names, dtype=object)[codes],
+        "year": df["Year"].to_numpy(dtype="int64"),
+        "quarter": df["Quater"].to_numpy(dtype="int64"),
+        "value": df[col].to_numpy(dtype="float64"),
+    })
@@ -0,0 +1,242 @@
+"""Incremental refresh of the 12 datasets from the Pulse JSON tree.
+
+A manifest records every processed JSON file (path, mtime, size, sha1 and the
+rows it produced). A refresh parses only new or changed files, replaces just
+their (State, Year, Quater) partitions in the CSVs (and Parquet copies, when
+present) and, optionally, in PostgreSQL. A new quarter upstream therefore
+costs a few dozen file reads instead of a full re-extract.
+
+A full extract (pulse_extract.py) seeds the manifest with every file it parsed,
+so the first refresh after it only sees files that changed since. The manifest
+also records whether the full extract wrote GeoJSON state names
+(--normalize-states); a refresh writes its partitions the same way. The new files are only moved into place once every dataset has been merged
+and validated, so a failed refresh leaves the previous CSVs untouched.
+
+Usage:
+    python incremental.py D:/Project/Data/data --out data [--load-db --dsn ...]
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from datasets import DATASETS, DATA_DIR, PARTITION_COLS, csv_path, read_csv
+from pulse_extract import SOURCES, extract_partitions, iter_source_files, list_states
+from states import normalize_name, normalize_states
+from storage import parquet_path, pyarrow, write_parquet
+from validate import validate
+
+MANIFEST_NAME = "pulse_manifest.json"
+MANIFEST_VERSION = 1
+
+
+# -----------------------------
+# Manifest
+# -----------------------------
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def manifest_path(out_dir=None):
+    return os.path.join(out_dir or DATA_DIR, MANIFEST_NAME)
+
+def load_manifest(path):
+    """Manifest dict; an empty one if the file is missing or from another version."""
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+def save_manifest(manifest, path):
+    """Write atomically so an interrupted run never leaves a half-written manifest."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def record_full_extract(root, out_dir, counts, normalize=False):
+    """
+    Seed the manifest after a full extract of `root` into out_dir: every source file with
+    its row counts (`counts` from extract_partitions) and how the State column was written.
+    """
+    _, _, entries = scan_changes(root, {"files": {}})
+    for entry in entries.values():
+        part = tuple(entry["partition"])
+        entry["rows"] = {key: counts[key].get(part, 0) for key in _dataset_keys(entry["section"])}
+    manifest = {"version": MANIFEST_VERSION, "files": entries, "normalize_states": bool(normalize)}
+    save_manifest(manifest, manifest_path(out_dir))
+
+
+# -----------------------------
+# Change detection
+# -----------------------------
+def scan_changes(root, manifest):
+    """
+    Compare the tree against the manifest.
+    Returns (changed, removed, entries):
+      changed  {state: set of absolute paths} that are new or whose content changed
+      removed  list of manifest keys whose file no longer exists
+      entries  {manifest key: entry} for every file currently in the tree
+    mtime+size is the fast path; when they differ the sha1 decides, so a fresh
+    clone (new mtimes, same bytes) does not trigger a re-parse.
+    """
+    known = manifest["files"]
+    changed, entries = {}, {}
+    for state in list_states(root):
+        for section, year, quarter, path in iter_source_files(root, state):
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            st = os.stat(path)
+            old = known.get(rel)
+            entry = {"section": section.replace(os.sep, "/"), "partition": [state, year, quarter],
+                     "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+            if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+                entry.update(sha1=old["sha1"], rows=old["rows"])
+            else:
+                entry["sha1"] = file_digest(path)
+                if old and old["sha1"] == entry["sha1"]:
+                    entry["rows"] = old["rows"]
+                else:
+                    changed.setdefault(state, set()).add(path)
+            entries[rel] = entry
+    removed = [rel for rel in known if rel not in entries]
+    return changed, removed, entries
+
+def _dataset_keys(section):
+    return list(SOURCES[section.replace("/", os.sep)])
+
+
+# -----------------------------
+# Partition upsert
+# -----------------------------
+def upsert_partitions(existing, new, partitions):
+    """Drop `partitions` from existing, append new rows, keep (State, Year, Quater) order."""
+    if partitions and not existing.empty:
+        idx = pd.MultiIndex.from_frame(existing[PARTITION_COLS])
+        existing = existing[~idx.isin(list(partitions))]
+    frames = [df for df in (existing, new) if not df.empty]
+    if not frames:
+        return existing
+    out = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return out.sort_values(PARTITION_COLS, kind="stable").reset_index(drop=True)
+
+def partition_key(entry, normalize=False):
+    """(State, Year, Quater) of a manifest entry, with the State as written to the CSVs."""
+    state, year, quarter = entry["partition"]
+    return (normalize_name(state) if normalize else state, year, quarter)
+
+def expected_counts(entries, normalize=False):
+    """Source row counts per dataset and partition, rebuilt from manifest entries."""
+    expected = {key: {} for key in DATASETS}
+    for entry in entries.values():
+        part = partition_key(entry, normalize)
+        for key, n in entry.get("rows", {}).items():
+            # several slugs can map to one name; their counts add up like their rows
+            expected[key][part] = expected[key].get(part, 0) + n
+    return expected
+
+def refresh(root, out_dir=None, workers=None, load_db=False, dsn=None):
+    """
+    Parse new/changed files and upsert their partitions.
+    Returns {dataset key: number of partitions replaced}.
+    """
+    out_dir = out_dir or DATA_DIR
+    mpath = manifest_path(out_dir)
+    manifest = load_manifest(mpath)
+    normalize = manifest.get("normalize_states", False)
+    changed, removed, entries = scan_changes(root, manifest)
+    if not changed and not removed:
+        return {}
+
+    states = sorted(changed)
+    new_dfs, counts = extract_partitions(root, states, workers, files=changed)
+    if normalize:
+        for df in new_dfs.values():
+            if "State" in df.columns:
+                df["State"] = normalize_states(df["State"])
+
+    # Partitions to replace per dataset: every changed or removed file's partition
+    touched = {key: set() for key in DATASETS}
+    for state, paths in changed.items():
+        for path in paths:
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            entry = entries[rel]
+            part = tuple(entry["partition"])
+            entry["rows"] = {key: counts[key].get(part, 0) for key in _dataset_keys(entry["section"])}
+            for key in entry["rows"]:
+                touched[key].add(partition_key(entry, normalize))
+    for rel in removed:
+        entry = manifest["files"][rel]
+        for key in _dataset_keys(entry["section"]):
+            touched[key].add(partition_key(entry, normalize))
+
+    expected = expected_counts(entries, normalize)
+    updated = {}
+    for key, parts in touched.items():
+        if not parts:
+            continue
+        merged = upsert_partitions(read_csv(key, out_dir), new_dfs[key], parts)
+        validate({key: merged}, {key: expected[key]})
+        updated[key] = merged
+
+    # Stage every file first; nothing is replaced unless all of them were written
+    os.makedirs(out_dir, exist_ok=True)
+    staged = []
+    try:
+        for key, df in updated.items():
+            path = csv_path(key, out_dir)
+            staged.append((f"{path}.{os.getpid()}.tmp", path))
+            df.to_csv(staged[-1][0], index=False)
+            if pyarrow is not None and os.path.exists(parquet_path(key, out_dir)):
+                # stamped with the staged CSV: os.replace keeps its size and mtime
+                csv_tmp, path = staged[-1][0], parquet_path(key, out_dir)
+                staged.append((f"{path}.{os.getpid()}.tmp", path))
+                write_parquet(key, df, out_dir, path=staged[-1][0], source=csv_tmp)
+
+        if load_db:
+            from db_load import connect, replace_partitions, stamp_load
+            conn = connect(dsn)
+            try:
+                for key in updated:
+                    replace_partitions(conn, key, new_dfs[key], touched[key])
+                stamp_load(conn)
+            finally:
+                conn.close()
+
+        for tmp, path in staged:
+            os.replace(tmp, path)
+    finally:
+        for tmp, _ in staged:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    manifest["files"] = entries
+    manifest["normalize_states"] = normalize
+    save_manifest(manifest, mpath)
+    return {key: len(touched[key]) for key in updated}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse only new/changed Pulse JSON files and upsert their partitions.")
+    parser.add_argument("root", help="Pulse repository data/ directory")
+    parser.add_argument("--out", default=DATA_DIR, help="directory holding the CSVs and the manifest")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--load-db", action="store_true", help="also replace the partitions in PostgreSQL")
+    parser.add_argument("--dsn", default=None)
+    args = parser.parse_args(argv)
+
+    updated = refresh(args.root, args.out, args.workers, args.load_db, args.dsn)
+    if not updated:
+        print("Up to date.")
+    for key, n in updated.items():
+        print(f"{DATASETS[key]['csv']}: {n} partitions replaced")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""Optional timing, memory and cache instrumentation for the dashboard.
+
+Off unless PULSE_PROFILE is set; when it is off, `timed` and `cache` return the
+functions unchanged and `span` is a no-op, so the instrumented code paths cost
+nothing. With PULSE_PROFILE=1 every Streamlit run of a page records its spans
+(load, normalize, aggregate, figure, render) and the cache hits/misses of the
+data caches:
+
+    span        wall time, RSS delta (Linux), and with PULSE_PROFILE=memory the
+                tracemalloc delta; nested spans are kept with their depth
+    run         one script run of one page in one session; the spans above plus
+                the run's total time and tracemalloc peak
+    totals      process-wide counters per (page, stage, span) and per cache
+
+Exports:
+    - a JSON line per run on the "pulse.profile" logger (PULSE_PROFILE_LOG=<file>
+      adds a file handler)
+    - Prometheus text format from prometheus_text(), served at
+      http://127.0.0.1:PULSE_PROFILE_PORT/metrics when that is set
+      (PULSE_PROFILE_HOST=0.0.0.0 exposes it beyond this machine)
+The dashboard shows the current run, the session's history and the totals in a
+collapsed "Profiling" panel.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_MODE = os.environ.get("PULSE_PROFILE", "").strip().lower()
+ENABLED = _MODE not in ("", "0", "false", "off")
+TRACE_MEMORY = _MODE == "memory"
+
+# Runs kept per session for the debug panel
+HISTORY_SIZE = 50
+
+logger = logging.getLogger("pulse.profile")
+if ENABLED and os.environ.get("PULSE_PROFILE_LOG"):
+    _handler = logging.FileHandler(os.environ["PULSE_PROFILE_LOG"], encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes():
+    """Current resident set size of this process (Linux /proc); None elsewhere."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# -----------------------------
+# Runs and spans
+# -----------------------------
+class Run:
+    """Spans recorded during one script run of `page`."""
+
+    def __init__(self, page, session=None):
+        self.page = page
+        self.session = session
+        self.started = time.time()
+        self.spans = []
+        self.cache = defaultdict(lambda: {"hit": 0, "miss": 0})
+        self.seconds = None
+        self.peak_bytes = None
+        self._t0 = time.perf_counter()
+        self._depth = 0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._t0
+        if TRACE_MEMORY and tracemalloc.is_tracing():
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        return self
+
+    def to_dict(self):
+        return {"page": self.page, "session": self.session, "started": self.started,
+                "seconds": self.seconds, "peak_bytes": self.peak_bytes,
+                "spans": self.spans, "cache": dict(self.cache)}
+
+
+class _Totals:
+    """Process-wide counters, shared by every session (guarded by a lock)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = defaultdict(lambda: [0, 0.0])    # (page, stage, name) -> [count, seconds]
+        self.cache = defaultdict(lambda: [0, 0])      # name -> [hits, misses]
+        self.runs = defaultdict(lambda: [0, 0.0])     # page -> [count, seconds]
+
+    def add_run(self, run):
+        with self.lock:
+            totals = self.runs[run.page]
+            totals[0] += 1
+            totals[1] += run.seconds or 0.0
+            for s in run.spans:
+                totals = self.spans[(run.page, s["stage"], s["name"])]
+                totals[0] += 1
+                totals[1] += s["seconds"]
+            for name, counts in run.cache.items():
+                totals = self.cache[name]
+                totals[0] += counts["hit"]
+                totals[1] += counts["miss"]
+
+TOTALS = _Totals()
+_local = threading.local()
+
+
+def current_run():
+    """The run recording on this thread (each Streamlit session runs its script in its own thread), or None."""
+    return getattr(_local, "run", None)
+
+def start_run(page, session=None):
+    """Begin recording a page run on this thread; returns the Run (None when profiling is off)."""
+    if not ENABLED:
+        return None
+    if TRACE_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    _local.run = Run(page, session)
+    return _local.run
+
+def end_run():
+    """Finish this thread's run, add it to the totals and log it as one JSON line."""
+    run = current_run()
+    if run is None:
+        return None
+    _local.run = None
+    run.finish()
+    TOTALS.add_run(run)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(run.to_dict(), default=str))
+    return run
+
+@contextlib.contextmanager
+def _record(stage, name, **extra):
+    run = current_run()
+    if run is None:
+        yield
+        return
+    rss = rss_bytes()
+    traced = tracemalloc.get_traced_memory()[0] if TRACE_MEMORY and tracemalloc.is_tracing() else None
+    depth = run._depth
+    run._depth += 1
+    t0 = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        seconds = time.perf_counter() - t0
+        run._depth = depth
+        entry = {"stage": stage, "name": name, "depth": depth, "seconds": seconds,
+                 "offset": t0 - run._t0}
+        if rss is not None:
+            entry["rss_delta"] = rss_bytes() - rss
+        if traced is not None:
+            entry["traced_delta"] = tracemalloc.get_traced_memory()[0] - traced
+        entry.update(extra)
+        run.spans.append(entry)
+
+def span(stage, name):
+    """Context manager timing a block; yields a dict for extra fields (e.g. payload bytes). No-op when off."""
+    return _record(stage, name) if ENABLED else contextlib.nullcontext({})
+
+def timed(stage, name=None):
+    """Decorator recording every call of a function as a span; returns the function unchanged when off."""
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            with _record(stage, label):
+                return fn(*args, **kwargs)
+        return call
+    return wrap
+
+def cache(decorator, name=None):
+    """
+    Apply a caching decorator (st.cache_resource, lru_cache, ...) and count its hits
+    and misses: a miss is a call that ran the function body. Every call is a "cache" span.
+    Returns decorator(fn) unchanged when off.
+    """
+    def wrap(fn):
+        if not ENABLED:
+            return decorator(fn)
+        label = name or fn.__qualname__
+        flag = threading.local()
+
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            flag.miss = True
+            return fn(*args, **kwargs)
+        cached = decorator(body)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            outer, flag.miss = getattr(flag, "miss", False), False
+            try:
+                with _record("cache", label) as extra:
+                    result = cached(*args, **kwargs)
+                    if extra is not None:
+                        extra["hit"] = not flag.miss
+            finally:
+                run = current_run()
+                if run is not None:
+                    run.cache[label]["miss" if flag.miss else "hit"] += 1
+                flag.miss = outer
+            return result
+        for attr in ("clear", "cache_clear", "cache_info"):
+            if hasattr(cached, attr):
+                setattr(call, attr, getattr(cached, attr))
+        return call
+    return wrap
+
+
+# -----------------------------
+# Exports
+# -----------------------------
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def prometheus_text():
+    """Process-wide totals in the Prometheus text exposition format."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            rendered = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}")
+
+    with TOTALS.lock:
+        runs = sorted(TOTALS.runs.items())
+        spans = sorted(TOTALS.spans.items())
+        caches = sorted(TOTALS.cache.items())
+    metric("pulse_page_runs_total", "counter", "Script runs per page.",
+           [({"page": p}, c) for p, (c, _) in runs])
+    metric("pulse_page_seconds_total", "counter", "Wall time of the script runs per page.",
+           [({"page": p}, f"{s:.6f}") for p, (_, s) in runs])
+    metric("pulse_span_calls_total", "counter", "Instrumented calls per page, stage and span.",
+           [({"page": p, "stage": st, "span": n}, c) for (p, st, n), (c, _) in spans])
+    metric("pulse_span_seconds_total", "counter", "Wall time per page, stage and span.",
+           [({"page": p, "stage": st, "span": n}, f"{s:.6f}") for (p, st, n), (_, s) in spans])
+    metric("pulse_cache_requests_total", "counter", "Data cache lookups by result.",
+           [({"cache": n, "result": r}, v) for n, (h, m) in caches for r, v in (("hit", h), ("miss", m))])
+    rss = rss_bytes()
+    if rss is not None:
+        metric("pulse_process_resident_memory_bytes", "gauge", "Resident set size of the dashboard process.",
+               [({}, rss)])
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+def serve_metrics(port=None, host=None):
+    """
+    Serve prometheus_text() at /metrics on a daemon thread, once per process; returns the server or None.
+    A failed bind is remembered, so later calls (every script run) neither retry nor warn again.
+    """
+    global _server, _server_failed
+    port = port if port is not None else os.environ.get("PULSE_PROFILE_PORT")
+    host = host or os.environ.get("PULSE_PROFILE_HOST", "127.0.0.1")
+    if not ENABLED or not port:
+        return None
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:  # another worker process already holds the port
+                _server_failed = True
+                logger.warning("profiling metrics endpoint not started on %s:%s: %s", host, port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="pulse-metrics", daemon=True).start()
+    return _server
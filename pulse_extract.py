@@ -0,0 +1,248 @@
+"""Parallel extractor for the PhonePe Pulse JSON tree.
+
+Replaces the nested os.listdir loops in Project.ipynb. Each state directory is
+parsed in its own worker process; rows are streamed straight into typed column
+buffers and the 12 datasets defined in datasets.py are built once at the end.
+
+Usage:
+    python pulse_extract.py D:/Project/Data/data --out data
+"""
+import argparse
+import json
+import os
+import warnings
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from datasets import DATASETS, DATA_DIR, csv_path
+from states import normalize_states, unknown_states
+from storage import refresh_parquet
+from validate import validate as check_row_counts
+
+STATE_SUBPATH = os.path.join("country", "india", "state")
+
+
+# -----------------------------
+# Row parsers: JSON document -> entity rows (without State/Year/Quater)
+# -----------------------------
+def _agg_transactions(doc):
+    for z in doc["data"].get("transactionData") or []:
+        pi = z["paymentInstruments"][0]
+        yield z["name"], pi["count"], pi["amount"]
+
+def _agg_users(doc):
+    for z in doc["data"].get("usersByDevice") or []:
+        yield z["brand"], z["count"], z["percentage"]
+
+def _map_hover_list(doc):
+    for z in doc["data"].get("hoverDataList") or []:
+        yield z["name"], z["metric"][0]["count"], z["metric"][0]["amount"]
+
+def _map_user_hover(doc):
+    for district, v in (doc["data"].get("hoverData") or {}).items():
+        yield district, v["registeredUsers"], v["appOpens"]
+
+def _top_metric(section):
+    def rows(doc):
+        for z in doc["data"].get(section) or []:
+            yield z["entityName"], z["metric"]["count"], z["metric"]["amount"]
+    return rows
+
+def _top_users(section):
+    def rows(doc):
+        for z in doc["data"].get(section) or []:
+            yield z["name"], z["registeredUsers"]
+    return rows
+
+
+# Pulse section (relative to data root) -> {dataset key: row parser}.
+# Top files carry district and pincode lists side by side, so one file feeds two datasets.
+SOURCES = {
+    os.path.join("aggregated", "transaction"): {"agg_trans": _agg_transactions},
+    os.path.join("aggregated", "user"): {"agg_user": _agg_users},
+    os.path.join("aggregated", "insurance"): {"agg_ins": _agg_transactions},
+    os.path.join("map", "transaction", "hover"): {"map_trans": _map_hover_list},
+    os.path.join("map", "user", "hover"): {"map_user": _map_user_hover},
+    os.path.join("map", "insurance", "hover"): {"map_ins": _map_hover_list},
+    os.path.join("top", "transaction"): {"top_tx_dist": _top_metric("districts"),
+                                         "top_tx_pin": _top_metric("pincodes")},
+    os.path.join("top", "user"): {"top_user_dist": _top_users("districts"),
+                                  "top_user_pin": _top_users("pincodes")},
+    os.path.join("top", "insurance"): {"top_ins_dist": _top_metric("districts"),
+                                       "top_ins_pin": _top_metric("pincodes")},
+}
+
+
+# -----------------------------
+# Typed column buffers
+# -----------------------------
+_BUFFER_TYPECODES = {"int": "q", "float": "d"}
+
+def _new_buffer(kind):
+    code = _BUFFER_TYPECODES.get(kind)
+    return array(code) if code else []
+
+class ColumnBuffer:
+    """Append-only columnar storage for one dataset, typed per DATASETS."""
+
+    def __init__(self, key):
+        self.key = key
+        self.kinds = DATASETS[key]["columns"]
+        self.columns = {c: _new_buffer(k) for c, k in self.kinds.items()}
+        self._appenders = [self.columns[c].append for c in self.kinds]
+
+    def append(self, row):
+        for append, value in zip(self._appenders, row):
+            append(value)
+
+    def extend(self, other):
+        for c, buf in other.columns.items():
+            self.columns[c].extend(buf)
+
+    def __len__(self):
+        return len(self.columns["State"])
+
+    def to_frame(self):
+        data = {}
+        for c, kind in self.kinds.items():
+            buf = self.columns[c]
+            if kind == "Int64":
+                data[c] = pd.array([None if v is None else int(v) for v in buf], dtype="Int64")
+            elif kind == "str":
+                data[c] = pd.Series(buf, dtype=object)
+            else:
+                data[c] = pd.Series(buf, dtype="int64" if kind == "int" else "float64")
+        return pd.DataFrame(data)
+
+
+# -----------------------------
+# Tree walk
+# -----------------------------
+def _iter_quarter_files(state_dir):
+    """Yield (year, quarter, path) for every <year>/<quarter>.json under a state directory."""
+    for year in sorted(os.listdir(state_dir)):
+        year_dir = os.path.join(state_dir, year)
+        if not os.path.isdir(year_dir):
+            continue
+        for name in sorted(os.listdir(year_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext == ".json":
+                yield int(year), int(stem), os.path.join(year_dir, name)
+
+def list_states(root):
+    """Union of the state directory names across all Pulse sections."""
+    states = set()
+    for section in SOURCES:
+        d = os.path.join(root, section, STATE_SUBPATH)
+        if os.path.isdir(d):
+            states.update(s for s in os.listdir(d) if os.path.isdir(os.path.join(d, s)))
+    return sorted(states)
+
+def iter_source_files(root, state):
+    """Yield (section, year, quarter, path) for every JSON file of one state."""
+    for section in SOURCES:
+        state_dir = os.path.join(root, section, STATE_SUBPATH, state)
+        if os.path.isdir(state_dir):
+            for year, quarter, path in _iter_quarter_files(state_dir):
+                yield section, year, quarter, path
+
+def extract_state(root, state, files=None):
+    """
+    Parse every section for one state. Runs inside a worker process.
+    files: optional set of paths to restrict parsing to (incremental mode).
+    Returns (buffers, counts) where counts[key][(state, year, quarter)] is the
+    number of rows each source file produced.
+    """
+    buffers = {key: ColumnBuffer(key) for parsers in SOURCES.values() for key in parsers}
+    counts = {key: {} for key in buffers}
+    for section, year, quarter, path in iter_source_files(root, state):
+        if files is not None and path not in files:
+            continue
+        parsers = SOURCES[section]
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        for key, parse in parsers.items():
+            append = buffers[key].append
+            n = 0
+            for row in parse(doc):
+                append((state, year, quarter) + tuple(row))
+                n += 1
+            counts[key][(state, year, quarter)] = n
+    return buffers, counts
+
+def extract_partitions(root, states, workers=None, files=None):
+    """
+    Fan extract_state out over a process pool.
+    files: optional {state: set of paths}; only those files are parsed.
+    Returns (dfs, counts) with counts merged across states.
+    """
+    merged = {key: ColumnBuffer(key) for key in DATASETS}
+    expected = {key: {} for key in DATASETS}
+    file_sets = [files.get(s) if files is not None else None for s in states]
+
+    def collect(results):
+        for buffers, counts in results:
+            for key, buf in buffers.items():
+                merged[key].extend(buf)
+                expected[key].update(counts[key])
+
+    if workers == 1:
+        collect(extract_state(root, s, f) for s, f in zip(states, file_sets))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() preserves state order, so output row order is deterministic
+            collect(pool.map(extract_state, [root] * len(states), states, file_sets))
+    return {key: buf.to_frame() for key, buf in merged.items()}, expected
+
+def extract_all(root, workers=None, states=None, validate=True, normalize=False, with_counts=False):
+    """
+    Extract all 12 datasets from a Pulse `data/` root. Returns dict of key -> DataFrame.
+    With validate=True the result is checked against the per-file row counts and
+    a RowCardinalityError is raised on any blow-up. With normalize=True the State
+    column holds the GeoJSON state names (see states.py) instead of the raw slugs.
+    with_counts=True returns (dfs, counts), the per-partition source row counts.
+    """
+    states = states if states is not None else list_states(root)
+    unknown = unknown_states(states)
+    if unknown:
+        warnings.warn(f"state directories not in states.STATE_NAMES: {', '.join(unknown)}")
+    dfs, expected = extract_partitions(root, states, workers)
+    if validate:
+        check_row_counts(dfs, expected)
+    if normalize:
+        for df in dfs.values():
+            if "State" in df.columns:
+                df["State"] = normalize_states(df["State"])
+    return (dfs, expected) if with_counts else dfs
+
+def write_csvs(dfs, out_dir=None):
+    """Write each extracted dataset to its CSV file name from DATASETS (and its Parquet copy, if any)."""
+    out_dir = out_dir or DATA_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    for key, df in dfs.items():
+        df.to_csv(csv_path(key, out_dir), index=False)
+        refresh_parquet(key, df, out_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the PhonePe Pulse JSON tree into the 12 CSV datasets.")
+    parser.add_argument("root", help="Pulse repository data/ directory (contains aggregated/, map/, top/)")
+    parser.add_argument("--out", default=DATA_DIR, help="output directory for the CSVs")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--normalize-states", action="store_true",
+                        help="write GeoJSON state names instead of the Pulse slugs")
+    args = parser.parse_args(argv)
+
+    dfs, counts = extract_all(args.root, workers=args.workers, normalize=args.normalize_states, with_counts=True)
+    write_csvs(dfs, args.out)
+    # incremental.py refreshes start from these files and write partitions the same way
+    from incremental import record_full_extract
+    record_full_extract(args.root, args.out, counts, args.normalize_states)
+    for key, df in dfs.items():
+        print(f"{DATASETS[key]['csv']}: {len(df)} rows")
+
+
+if __name__ == "__main__":
+    main()
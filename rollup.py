@@ -0,0 +1,179 @@
+"""State-level rollup cube for the dashboard.
+
+Every metric the dashboard shows is a sum over one of the 12 datasets. This
+module computes all of them once per data refresh as a single
+(state, year, quarter) x metric table and persists it under data/cache/, keyed
+by the data version. The Home map, the scenario pages and the hover data then
+slice this small table (a few thousand rows) instead of re-aggregating the raw
+datasets on every Streamlit rerun.
+
+Usage:
+    python rollup.py [data_dir]
+"""
+import argparse
+import os
+
+import pandas as pd
+
+from datasets import PARTITION_COLS, cache_dir, data_version, drop_old_versions, replace_file
+from profiling import timed
+from states import normalize_state_col
+from storage import pyarrow, read_datasets
+
+# metric name -> (dataset key, source column)
+METRICS = {
+    # transactions
+    "transaction_amount": ("agg_trans", "Transaction_amount"),
+    "transaction_count": ("agg_trans", "Transaction_count"),
+    "map_trans_amount": ("map_trans", "amount"),
+    "map_trans_count": ("map_trans", "count"),
+    "dist_trans_amount": ("top_tx_dist", "D_Amount"),
+    "pin_trans_amount": ("top_tx_pin", "P_Amount"),
+    # users
+    "total_users": ("agg_user", "Brand_count"),
+    "map_users": ("map_user", "Registered_users"),
+    "map_app_opens": ("map_user", "App_opens"),
+    "dist_user_count": ("top_user_dist", "Registeredusers_D"),
+    "pin_user_count": ("top_user_pin", "Registeredusers_P"),
+    # insurance
+    "insurance_amount": ("agg_ins", "Insurance_amount"),
+    "insurance_count": ("agg_ins", "Insurance_count"),
+    "map_ins_amount": ("map_ins", "Insurance_amount"),
+    "map_ins_count": ("map_ins", "Insurance_count"),
+    "dist_ins_amount": ("top_ins_dist", "D_Amount"),
+    "pin_ins_amount": ("top_ins_pin", "P_Amount"),
+}
+
+KEY_COLS = ["state", "year", "quarter"]
+
+# Category breakdowns: cube name -> (dataset key, category column, {metric: source column}).
+# Only agg_trans and agg_ins carry a category; these cubes add it as a fourth key.
+TYPE_CUBES = {
+    "transaction_type_cube": ("agg_trans", "Transaction_type",
+                              {"transaction_amount": "Transaction_amount", "transaction_count": "Transaction_count"}),
+    "insurance_type_cube": ("agg_ins", "Insurance_type",
+                            {"insurance_amount": "Insurance_amount", "insurance_count": "Insurance_count"}),
+}
+
+# Bump when METRICS or the cube layout changes so persisted cubes are rebuilt
+CUBE_VERSION = 3
+
+
+def metrics_by_dataset():
+    """{dataset key: [(metric, source column), ...]} in METRICS order."""
+    out = {}
+    for metric, (key, col) in METRICS.items():
+        out.setdefault(key, []).append((metric, col))
+    return out
+
+def required_columns():
+    """{dataset key: columns to read} for building the cubes."""
+    cols = {key: PARTITION_COLS + [col for _, col in pairs] for key, pairs in metrics_by_dataset().items()}
+    for key, type_col, _ in TYPE_CUBES.values():
+        cols[key].append(type_col)
+    return cols
+
+@timed("aggregate")
+def build_state_cube(dfs):
+    """
+    One groupby per dataset, aligned on (State, Year, Quater) in a single concat.
+    Returns a flat DataFrame: state, year, quarter, <metric columns>, with GeoJSON
+    state names (states.py).
+    """
+    parts = []
+    for key, cols in metrics_by_dataset().items():
+        df = dfs.get(key)
+        if df is None or df.empty:
+            continue
+        keys = df[PARTITION_COLS].astype({"State": str, "Year": "int64", "Quater": "int64"})
+        g = df[[c for _, c in cols]].groupby([keys[c] for c in PARTITION_COLS], sort=False).sum()
+        g.columns = [m for m, _ in cols]
+        parts.append(g)
+    return assemble_state_cube(parts)
+
+@timed("aggregate")
+def assemble_state_cube(parts):
+    """
+    Align per-dataset aggregates into the state cube. Each part is indexed by
+    (State, Year, Quater) and holds some of the METRICS columns; the query
+    backends (backends.py) pass their pushed-down aggregates here too.
+    """
+    if not parts:
+        return pd.DataFrame(columns=KEY_COLS + list(METRICS))
+    cube = pd.concat(parts, axis=1).reindex(columns=list(METRICS)).fillna(0)
+    cube.index.names = KEY_COLS
+    return normalize_state_col(cube.sort_index().reset_index())
+
+@timed("aggregate")
+def build_type_cube(dfs, name):
+    """state, year, quarter, <category>, <metrics> for one of TYPE_CUBES."""
+    key, type_col, metrics = TYPE_CUBES[name]
+    dim = type_col.lower()
+    df = dfs.get(key)
+    if df is None or df.empty:
+        return pd.DataFrame(columns=KEY_COLS + [dim] + list(metrics))
+    keys = df[PARTITION_COLS + [type_col]].astype({"State": str, "Year": "int64", "Quater": "int64", type_col: str})
+    g = df[list(metrics.values())].groupby([keys[c] for c in keys.columns], sort=False).sum()
+    g.columns = list(metrics)
+    g.index.names = KEY_COLS + [dim]
+    return normalize_state_col(g.sort_index().reset_index())
+
+def state_totals(cube, states=None):
+    """
+    All-period totals per state (the old master_df), plus total_activity.
+    states: optional full list of state names; absent ones get zeros.
+    """
+    metrics = [c for c in cube.columns if c in METRICS]
+    totals = cube.groupby("state", observed=True)[metrics].sum()
+    if states is not None:
+        totals = totals.reindex(totals.index.union(pd.Index(list(states), name="state")), fill_value=0)
+    totals["total_activity"] = totals[metrics].to_numpy().sum(axis=1)
+    return totals.sort_index().reset_index()
+
+
+# -----------------------------
+# Persistence
+# -----------------------------
+def cube_version(data_dir=None):
+    return f"{data_version(data_dir)}-v{CUBE_VERSION}"
+
+def cube_path(data_dir=None, version=None, name="state_cube"):
+    ext = "parquet" if pyarrow is not None else "csv"
+    return os.path.join(cache_dir(data_dir), f"{name}-{version or cube_version(data_dir)}.{ext}")
+
+def build_and_save(data_dir=None):
+    """Build the state cube and the category cubes; returns {name: DataFrame}."""
+    dfs = read_datasets(required_columns(), data_dir)
+    cubes = {"state_cube": build_state_cube(dfs)}
+    for name in TYPE_CUBES:
+        cubes[name] = build_type_cube(dfs, name)
+    version = cube_version(data_dir)
+    for name, cube in cubes.items():
+        path = cube_path(data_dir, version, name)
+        if path.endswith(".parquet"):
+            replace_file(path, lambda tmp: cube.to_parquet(tmp, index=False))
+        else:
+            replace_file(path, lambda tmp: cube.to_csv(tmp, index=False))
+        # drop cubes built from older data
+        drop_old_versions(f"{name}-", path, data_dir)
+    return cubes
+
+@timed("load")
+def load_state_cube(data_dir=None, name="state_cube"):
+    """Persisted cube for the current data version; built (once) if missing."""
+    path = cube_path(data_dir, name=name)
+    if os.path.exists(path):
+        return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    return build_and_save(data_dir)[name]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the state x year x quarter rollup cubes.")
+    parser.add_argument("data_dir", nargs="?", default=None)
+    args = parser.parse_args(argv)
+    for name, cube in build_and_save(args.data_dir).items():
+        print(f"{cube_path(args.data_dir, name=name)}: {len(cube)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Pre-indexed, LRU-cached period/category slices of the rollup cubes.
+
+The Home map filters (year range, quarters, transaction/insurance type) are
+answered from a SliceIndex: the cube rows are sorted once by
+(year, quarter, state), each period's rows form a contiguous block located by
+offsets, and per-state totals for a filter are computed with np.bincount over
+only the selected blocks. Results are memoized per filter in an LRU cache, so
+repeating a filter costs a dict lookup and a new one never rescans the raw
+datasets.
+
+Returned DataFrames are shared between callers (and Streamlit sessions); treat
+them as read-only.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+SLICE_CACHE_SIZE = 256
+
+
+def period_index(year, quarter):
+    """Year/quarter as one contiguous integer: consecutive quarters differ by 1."""
+    return year * 4 + (quarter - 1)
+
+
+class SliceIndex:
+    """Per-state totals of `metrics` for any (year range, quarters) filter."""
+
+    def __init__(self, cube, metrics, states=None, cache_size=SLICE_CACHE_SIZE):
+        cube = cube.sort_values(["year", "quarter", "state"], kind="stable")
+        periods = period_index(cube["year"].to_numpy(dtype="int64"), cube["quarter"].to_numpy(dtype="int64"))
+        self.metrics = list(metrics)
+        self.periods = np.unique(periods)
+        self._starts = np.searchsorted(periods, self.periods, side="left")
+        self._ends = np.searchsorted(periods, self.periods, side="right")
+        self.states = pd.Index(sorted(set(cube["state"]) | set(states or ())), name="state")
+        self._codes = self.states.get_indexer(cube["state"])
+        self._values = cube[self.metrics].to_numpy(dtype="float64")
+        self.years = sorted({int(p // 4) for p in self.periods})
+        self.totals = lru_cache(maxsize=cache_size)(self._totals)
+
+    def _blocks(self, year_from, year_to, quarters):
+        """Row ranges for the selected periods, with adjacent blocks merged."""
+        years, qs = self.periods // 4, self.periods % 4 + 1
+        sel = (years >= year_from) & (years <= year_to) & np.isin(qs, quarters)
+        blocks = []
+        for start, end in zip(self._starts[sel], self._ends[sel]):
+            if blocks and blocks[-1][1] == start:
+                blocks[-1][1] = end
+            else:
+                blocks.append([start, end])
+        return blocks
+
+    def _totals(self, year_from, year_to, quarters):
+        """Per-state metric totals for years [year_from, year_to] and the given quarters (a tuple)."""
+        blocks = self._blocks(year_from, year_to, quarters)
+        n = len(self.states)
+        out = np.zeros((n, len(self.metrics)))
+        if blocks:
+            rows = np.concatenate([np.arange(s, e) for s, e in blocks])
+            codes = self._codes[rows]
+            for j in range(len(self.metrics)):
+                out[:, j] = np.bincount(codes, weights=self._values[rows, j], minlength=n)
+        return pd.DataFrame(out, index=self.states, columns=self.metrics).reset_index()
+
+
+class CategorySliceIndex:
+    """A SliceIndex per category value (e.g. transaction type), summed over the selected categories."""
+
+    def __init__(self, cube, category_col, metrics, states=None, cache_size=SLICE_CACHE_SIZE):
+        self.category_col = category_col
+        self.categories = sorted(cube[category_col].dropna().unique())
+        self.metrics = list(metrics)
+        self._indexes = {c: SliceIndex(sub, metrics, states, cache_size)
+                         for c, sub in cube.groupby(category_col, sort=False)}
+        self.totals = lru_cache(maxsize=cache_size)(self._totals)
+
+    def _totals(self, year_from, year_to, quarters, categories):
+        frames = [self._indexes[c].totals(year_from, year_to, quarters) for c in categories if c in self._indexes]
+        if not frames:
+            return pd.DataFrame(columns=["state"] + self.metrics)
+        total = frames[0].set_index("state")
+        for f in frames[1:]:
+            total = total.add(f.set_index("state"), fill_value=0)
+        return total.reset_index()
@@ -0,0 +1,258 @@
+"""Precomputed Business Insights snapshots for the dashboard.
+
+`python snapshots.py` reads the datasets behind the scenario pages once, sums
+them per (entity, year), and derives every named query of backends.QUERIES for
+every contiguous year range. The results are written as one file per query
+under data/cache/snapshots-<version>/, with a year_from / year_to column pair
+and a manifest.json. The version is the data version plus SNAPSHOT_VERSION, so
+a data refresh makes old snapshots stale, never wrong. When the version
+matches, the dashboard answers the scenario pages from these files and skips
+the live aggregation. Otherwise it falls back to the query backend.
+
+The same run rewrites the CSVs in `Business Insights/` (all years, GeoJSON
+state names).
+
+Usage:
+    python snapshots.py [data_dir] [--insights "Business Insights"]
+"""
+import argparse
+import datetime
+import json
+import os
+
+import pandas as pd
+
+from backends import QUERIES
+from datasets import BASE_DIR, cache_dir, data_version, drop_old_versions, publish_dir
+from states import normalize_state_col
+from storage import pyarrow, read_datasets
+
+INSIGHTS_DIR = os.path.join(BASE_DIR, "Business Insights")
+
+# The Business Insights CSVs were written on Windows; rewrites keep their CRLF endings
+INSIGHTS_LINE_TERMINATOR = "\r\n"
+
+# partial -> (dataset key, group column, summed column); summed per (group, Year)
+PARTIALS = {
+    "transactions": ("agg_trans", "State", "Transaction_amount"),
+    "insurance": ("agg_ins", "State", "Insurance_amount"),
+    "users": ("agg_user", "State", "Brand_count"),
+    "brands": ("agg_user", "Brand", "Brand_count"),
+    "app_opens": ("map_user", "State", "App_opens"),
+}
+
+RANGE_COLS = ["year_from", "year_to"]
+
+# Bump when the queries or the file layout change so persisted snapshots are rebuilt
+SNAPSHOT_VERSION = 1
+
+
+def required_columns():
+    """{dataset key: columns to read} for all PARTIALS."""
+    cols = {}
+    for key, by, col in PARTIALS.values():
+        cols.setdefault(key, ["Year"])
+        cols[key] += [c for c in (by, col) if c not in cols[key]]
+    return cols
+
+def yearly_partials(dfs):
+    """{partial: group x year matrix of sums}; NaN where the group has no rows that year."""
+    out = {}
+    for name, (key, by, col) in PARTIALS.items():
+        df = dfs.get(key)
+        if df is None or df.empty:
+            out[name] = pd.DataFrame(dtype="float64")
+            continue
+        g = df.groupby([by, "Year"], observed=True)[col].sum().astype("float64")
+        out[name] = g.unstack("Year").sort_index(axis=1)
+    return out
+
+def _range_sums(matrix, year_from, year_to):
+    """Per-group sums over [year_from, year_to], only for groups with rows in that range."""
+    if matrix.empty:
+        return pd.Series(dtype="float64")
+    sub = matrix.loc[:, (matrix.columns >= year_from) & (matrix.columns <= year_to)]
+    return sub.sum(axis=1)[sub.notna().any(axis=1)]
+
+def range_results(partials, year_from, year_to):
+    """{query name: result} for one year range, with the same rows and columns as backends.PandasBackend."""
+    tx = _range_sums(partials["transactions"], year_from, year_to)
+    ins = _range_sums(partials["insurance"], year_from, year_to)
+    users = _range_sums(partials["users"], year_from, year_to)
+    opens = _range_sums(partials["app_opens"], year_from, year_to)
+    brands = _range_sums(partials["brands"], year_from, year_to)
+    trans = partials["transactions"]
+    years = trans.loc[:, (trans.columns >= year_from) & (trans.columns <= year_to)] if not trans.empty else trans
+    return {
+        # every state is kept, ranked; the limit is applied when served
+        "top_states": pd.DataFrame({"state": tx.index.astype(str), "total_amount": tx.to_numpy()})
+                      .sort_values("total_amount", ascending=False, ignore_index=True),
+        "yearly_growth": pd.DataFrame({"year": years.columns.astype("int64"), "total_amount": years.sum(axis=0).to_numpy()}),
+        "insurance_penetration": pd.DataFrame({"state": tx.index.astype(str),
+                                               "insurance_amount": ins.reindex(tx.index).fillna(0).to_numpy(),
+                                               "transaction_amount": tx.to_numpy()}),
+        "brand_users": pd.DataFrame({"brand": brands.index.astype(str), "brand_count": brands.to_numpy()})
+                       .sort_values("brand_count", ascending=False, ignore_index=True),
+        "engagement": pd.DataFrame({"state": users.index.astype(str),
+                                    "app_opens": opens.reindex(users.index).fillna(0).to_numpy(),
+                                    "registered_users": users.to_numpy()}),
+    }
+
+def snapshot_years(partials):
+    """Every year with rows in any partial; the snapshots cover all ranges between them."""
+    return sorted({int(y) for m in partials.values() for y in m.columns})
+
+def build_snapshots(dfs):
+    """
+    ({query name: long table of every contiguous year range, year_from / year_to first}, years).
+    Ranges without rows for a query (e.g. brand data after it stopped) have no rows in its table.
+    """
+    partials = yearly_partials(dfs)
+    years = snapshot_years(partials)
+    parts = {name: [] for name in QUERIES}
+    for i, year_from in enumerate(years):
+        for year_to in years[i:]:
+            for name, df in range_results(partials, year_from, year_to).items():
+                parts[name].append(df.assign(year_from=year_from, year_to=year_to))
+    out = {}
+    for name, frames in parts.items():
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RANGE_COLS)
+        df = df[RANGE_COLS + [c for c in df.columns if c not in RANGE_COLS]]
+        out[name] = normalize_state_col(df).astype({"state": str}) if "state" in df.columns else df
+    return out, years
+
+
+class Snapshot:
+    """Loaded snapshots of one version, indexed by (query, year_from, year_to)."""
+
+    def __init__(self, tables, years, manifest=None):
+        self.manifest = manifest or {}
+        self.years = sorted(int(y) for y in years)
+        self.tables = {name: df.reset_index(drop=True) for name, df in tables.items()}
+        self._rows = {name: df.groupby(RANGE_COLS, sort=False).indices if len(df) else {}
+                      for name, df in self.tables.items()}
+
+    def covers(self, name, year_from, year_to):
+        """Whether the range was precomputed: both ends are data years (a range may still have no rows)."""
+        return name in self.tables and year_from in self.years and year_to in self.years and year_from <= year_to
+
+    def query(self, name, year_from, year_to, limit=10):
+        """Same result as Backend.query(name, year_from, year_to, limit) for a covered range."""
+        rows = self._rows[name].get((int(year_from), int(year_to)), [])
+        df = self.tables[name].iloc[rows].drop(columns=RANGE_COLS).reset_index(drop=True)
+        if name == "top_states":
+            df = df.head(limit)
+        return normalize_state_col(df, "state")
+
+
+# -----------------------------
+# Persistence
+# -----------------------------
+def snapshot_version(data_dir=None):
+    return f"{data_version(data_dir)}-v{SNAPSHOT_VERSION}"
+
+def snapshot_dir(data_dir=None, version=None):
+    return os.path.join(cache_dir(data_dir), f"snapshots-{version or snapshot_version(data_dir)}")
+
+def _table_path(directory, name):
+    return os.path.join(directory, f"{name}.{'parquet' if pyarrow is not None else 'csv'}")
+
+def build_and_save(data_dir=None):
+    """Compute all snapshots and write them for the current data version; returns the Snapshot."""
+    dfs = read_datasets(required_columns(), data_dir)
+    tables, years = build_snapshots(dfs)
+    version = snapshot_version(data_dir)
+    final = snapshot_dir(data_dir, version)
+    manifest = {
+        "version": version,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "years": years,
+        "rows": {name: len(df) for name, df in tables.items()},
+    }
+
+    def write(tmp):
+        for name, df in tables.items():
+            path = _table_path(tmp, name)
+            if path.endswith(".parquet"):
+                df.to_parquet(path, index=False)
+            else:
+                df.to_csv(path, index=False)
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+    # written into a temp dir and renamed, so the dashboard never sees a partial snapshot
+    publish_dir(final, write)
+    # drop snapshots built from older data
+    drop_old_versions("snapshots-", final, data_dir)
+    return Snapshot(tables, years, manifest)
+
+def load_snapshot(data_dir=None):
+    """Snapshot for the current data version, or None when it has not been built."""
+    directory = snapshot_dir(data_dir)
+    manifest_file = os.path.join(directory, "manifest.json")
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, encoding="utf-8") as f:
+        manifest = json.load(f)
+    tables = {}
+    for name in QUERIES:
+        path = _table_path(directory, name)
+        if not os.path.exists(path):
+            return None
+        tables[name] = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    return Snapshot(tables, manifest["years"], manifest)
+
+
+# -----------------------------
+# Business Insights CSVs
+# -----------------------------
+def write_insights(snapshot, out_dir=None):
+    """The all-years results of a Snapshot as the Business Insights CSVs; returns the paths written."""
+    out_dir = out_dir or INSIGHTS_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    if not snapshot.years:
+        return []
+    year_from, year_to = snapshot.years[0], snapshot.years[-1]
+
+    def result(name, **kwargs):
+        return snapshot.query(name, year_from, year_to, **kwargs)
+
+    top = result("top_states", limit=10).rename(columns={"total_amount": "total_transaction_value"})
+    trend = result("yearly_growth").rename(columns={"total_amount": "total_transaction_value"})
+    pen = result("insurance_penetration").rename(columns={"insurance_amount": "total_insurance_value",
+                                                          "transaction_amount": "total_transaction_value"})
+    # full precision: the all-years percentages are small (~0.05) and would tie when rounded
+    pen["insurance_penetration_percent"] = (pen["total_insurance_value"]
+                                            / pen["total_transaction_value"].where(pen["total_transaction_value"] != 0) * 100)
+    pen = pen.sort_values("insurance_penetration_percent", ascending=False)
+    eng = result("engagement").rename(columns={"registered_users": "total_users", "app_opens": "total_app_opens"})
+    eng = eng[["state", "total_users", "total_app_opens"]]
+    eng["engagement_ratio"] = (eng["total_app_opens"] / eng["total_users"].where(eng["total_users"] != 0)).round(2)
+    eng = eng.sort_values("engagement_ratio", ascending=False)
+    brands = result("brand_users").rename(columns={"brand_count": "total_users"})
+
+    files = {"top_states.csv": top, "txn_trend.csv": trend, "insurance_pen.csv": pen,
+             "user_engagement.csv": eng, "brand_users.csv": brands}
+    paths = []
+    for file_name, df in files.items():
+        path = os.path.join(out_dir, file_name)
+        df.to_csv(path, index=False, lineterminator=INSIGHTS_LINE_TERMINATOR)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the Business Insights snapshots for every year range.")
+    parser.add_argument("data_dir", nargs="?", default=None)
+    parser.add_argument("--insights", default=INSIGHTS_DIR, help="directory for the Business Insights CSVs")
+    parser.add_argument("--no-insights", action="store_true", help="only write the versioned snapshots")
+    args = parser.parse_args(argv)
+
+    snapshot = build_and_save(args.data_dir)
+    print(f"{snapshot_dir(args.data_dir)}: " + ", ".join(f"{name} {len(df)} rows" for name, df in snapshot.tables.items()))
+    if not args.no_insights:
+        for path in write_insights(snapshot, args.insights):
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""State-name normalization shared by the extractor, the rollup and the dashboard.
+
+Pulse directory slugs ('andaman-&-nicobar-islands', 'jammu-&-kashmir', ...)
+are mapped to the GeoJSON `ST_NM` names that the India map is keyed on. Lookups
+go through a separator-insensitive key ('&' == 'and', '-' == ' '), so slugs,
+spaced variants and already-normalized names all resolve, and normalizing
+twice is a no-op.
+
+Columns are normalized per unique value: the column is factorized (or its
+categorical codes reused), each distinct name is mapped once, and the result
+is broadcast back as a Categorical through the codes. This replaces a
+Python-level loop over every row.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from profiling import timed
+
+# Pulse slug -> GeoJSON ST_NM name
+STATE_NAMES = {
+    'andaman-&-nicobar-islands': 'Andaman & Nicobar',
+    'andhra-pradesh': 'Andhra Pradesh',
+    'arunachal-pradesh': 'Arunachal Pradesh',
+    'assam': 'Assam',
+    'bihar': 'Bihar',
+    'chandigarh': 'Chandigarh',
+    'chhattisgarh': 'Chhattisgarh',
+    'dadra-&-nagar-haveli-&-daman-&-diu': 'Dadra and Nagar Haveli and Daman and Diu',
+    'delhi': 'Delhi',
+    'goa': 'Goa',
+    'gujarat': 'Gujarat',
+    'haryana': 'Haryana',
+    'himachal-pradesh': 'Himachal Pradesh',
+    'jammu-&-kashmir': 'Jammu & Kashmir',
+    'jharkhand': 'Jharkhand',
+    'karnataka': 'Karnataka',
+    'kerala': 'Kerala',
+    'ladakh': 'Ladakh',
+    'lakshadweep': 'Lakshadweep',
+    'madhya-pradesh': 'Madhya Pradesh',
+    'maharashtra': 'Maharashtra',
+    'manipur': 'Manipur',
+    'meghalaya': 'Meghalaya',
+    'mizoram': 'Mizoram',
+    'nagaland': 'Nagaland',
+    'odisha': 'Odisha',
+    'puducherry': 'Puducherry',
+    'punjab': 'Punjab',
+    'rajasthan': 'Rajasthan',
+    'sikkim': 'Sikkim',
+    'tamil-nadu': 'Tamil Nadu',
+    'telangana': 'Telangana',
+    'tripura': 'Tripura',
+    'uttar-pradesh': 'Uttar Pradesh',
+    'uttarakhand': 'Uttarakhand',
+    'west-bengal': 'West Bengal',
+}
+
+
+def canonical_key(name):
+    """Separator-insensitive lookup key: lower case, '&' -> 'and', '-'/'_' -> ' ', single spaces."""
+    s = str(name).strip().lower().replace('&', ' and ').replace('-', ' ').replace('_', ' ')
+    return ' '.join(s.split())
+
+# canonical key -> ST_NM; the target names map to themselves so normalization is idempotent
+_LOOKUP = {canonical_key(k): v for k, v in STATE_NAMES.items()}
+_LOOKUP.update({canonical_key(v): v for v in STATE_NAMES.values()})
+
+
+@lru_cache(maxsize=None)
+def normalize_name(name):
+    """GeoJSON name for one raw state value; unknown names fall back to title case."""
+    return _LOOKUP.get(canonical_key(name), str(name).strip().replace('-', ' ').title())
+
+def unknown_states(names):
+    """Names that are not in STATE_NAMES (they would only get the title-case fallback)."""
+    return sorted({str(n) for n in names if canonical_key(n) not in _LOOKUP})
+
+@timed("normalize")
+def normalize_states(values):
+    """Normalize a Series/array of state names; returns a Categorical aligned with the input."""
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    mapped = [normalize_name(u) for u in uniques]
+    categories = pd.Index(sorted(set(mapped)))
+    remap = categories.get_indexer(mapped)
+    # -1 codes (missing values) stay -1
+    new_codes = np.where(codes >= 0, remap[codes], -1) if len(remap) else codes
+    return pd.Categorical.from_codes(new_codes, categories)
+
+def normalize_state_col(df, col='state'):
+    """Normalize df[col] in place (as a categorical column) and return df."""
+    if col not in df.columns:
+        return df
+    df[col] = normalize_states(df[col])
+    return df
+
+def reconcile(names, geo_names):
+    """
+    Compare data state names against the GeoJSON ST_NM set after normalization.
+    Returns (missing_in_geo, missing_in_data): data names the map cannot place,
+    and map states with no data.
+    """
+    data = {normalize_name(n) for n in names}
+    geo = set(geo_names)
+    return sorted(data - geo), sorted(geo - data)
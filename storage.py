@@ -0,0 +1,207 @@
+"""Columnar (Parquet) storage for the 12 Pulse datasets.
+
+The CSVs stay the source of truth; `python storage.py` writes a typed Parquet
+copy of each one next to them under data/parquet/. In the Parquet files, the
+repeated text columns (State, District, Brand, ...) are dictionary-encoded
+categoricals, Year/Quater are small integers and the metrics keep their numeric
+types. read_dataset() prefers the Parquet copy and reads only the requested
+columns. It falls back to the CSV when pyarrow or the file is missing. Each
+Parquet file records the size and mtime of the CSV it was written from, and a
+copy whose CSV has changed since is stale: it is ignored until rewritten.
+
+read_dataset(prefer="arrow") goes through a second, memory-mapped cache: an
+uncompressed Arrow IPC (Feather v2) file per dataset under
+data/cache/arrow-<data version>/. Every process that reads it maps the same
+pages from the OS page cache, and the numeric columns come back as zero-copy
+views of the mapping, so N dashboard workers share one copy of the data.
+Copies for older data versions are left in place, since another process may
+still have them mapped; `python storage.py --prune` removes them.
+
+Usage:
+    python storage.py [data_dir] [--arrow] [--prune]
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from datasets import DATASETS, DATA_DIR, cache_dir, csv_path, data_version, drop_old_versions, read_csv, replace_file
+from profiling import timed
+
+try:
+    import pyarrow  # noqa: F401  (pandas' Parquet engine)
+    import pyarrow.feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+PARQUET_SUBDIR = "parquet"
+ARROW_PREFIX = "arrow-"
+
+# Columns stored as categoricals (dictionary-encoded in Parquet)
+CATEGORICAL_COLS = {"State", "District", "Transaction_type", "Brand", "Insurance_type"}
+
+# Narrow integer types for the partition columns
+SMALL_INT_COLS = {"Year": "int16", "Quater": "int8"}
+
+# Parquet schema metadata key holding the source CSV's "size:mtime_ns"
+SOURCE_KEY = b"pulse.source_csv"
+
+
+def parquet_path(key, data_dir=None):
+    return os.path.join(data_dir or DATA_DIR, PARQUET_SUBDIR, os.path.splitext(DATASETS[key]["csv"])[0] + ".parquet")
+
+def columnar_dtypes(key, columns=None):
+    """Dict of column -> compact pandas dtype for a dataset."""
+    out = {}
+    for c, kind in DATASETS[key]["columns"].items():
+        if columns is not None and c not in columns:
+            continue
+        if c in CATEGORICAL_COLS:
+            out[c] = "category"
+        elif c in SMALL_INT_COLS:
+            out[c] = SMALL_INT_COLS[c]
+        elif kind == "Int64":
+            out[c] = "Int32"  # pincodes fit in 32 bits
+        elif kind == "int":
+            out[c] = "int64"
+        elif kind == "float":
+            out[c] = "float64"
+        else:
+            out[c] = "object"
+    return out
+
+def to_columnar(df, key):
+    """Cast a dataset DataFrame to its compact columnar dtypes."""
+    return df.astype(columnar_dtypes(key, df.columns))
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}".encode()
+
+def write_parquet(key, df, data_dir=None, path=None, source=None):
+    """
+    Write the Parquet copy of a dataset, stamped with its source CSV (`source`,
+    default the dataset's CSV in data_dir) so has_parquet() can tell when it goes stale.
+    """
+    path = path or parquet_path(key, data_dir)
+    source = source or csv_path(key, data_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pyarrow.Table.from_pandas(to_columnar(df, key), preserve_index=False)
+    if os.path.exists(source):
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_KEY: _source_stamp(source)})
+    pyarrow.parquet.write_table(table, path)
+    return path
+
+def has_parquet(key, data_dir=None):
+    """Whether a Parquet copy exists and was written from the current CSV (reads only the file footer)."""
+    path = parquet_path(key, data_dir)
+    if pyarrow is None or not os.path.exists(path):
+        return False
+    source = csv_path(key, data_dir)
+    if not os.path.exists(source):
+        return True
+    metadata = pyarrow.parquet.read_schema(path).metadata or {}
+    return metadata.get(SOURCE_KEY) == _source_stamp(source)
+
+def refresh_parquet(key, df, data_dir=None):
+    """Rewrite a dataset's Parquet copy after its CSV was rewritten; no-op when there is no copy."""
+    if pyarrow is not None and os.path.exists(parquet_path(key, data_dir)):
+        return write_parquet(key, df, data_dir)
+    return None
+
+# -----------------------------
+# Memory-mapped Arrow cache
+# -----------------------------
+def arrow_path(key, data_dir=None, version=None):
+    return os.path.join(cache_dir(data_dir), ARROW_PREFIX + (version or data_version(data_dir)),
+                        os.path.splitext(DATASETS[key]["csv"])[0] + ".arrow")
+
+def write_arrow(key, data_dir=None, version=None):
+    """Write the uncompressed (mappable) Arrow copy of one dataset; atomic, so readers never see a partial file."""
+    path = arrow_path(key, data_dir, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = read_dataset(key, data_dir=data_dir)
+    return replace_file(path, lambda tmp: pyarrow.feather.write_feather(df, tmp, compression="uncompressed"))
+
+def prune_arrow(data_dir=None):
+    """Remove the Arrow caches of older data versions; returns the removed directories."""
+    current = os.path.dirname(arrow_path(next(iter(DATASETS)), data_dir))
+    return drop_old_versions(ARROW_PREFIX, current, data_dir)
+
+def read_mapped(key, columns=None, data_dir=None):
+    """
+    One dataset from the memory-mapped Arrow cache (written on first use for the current
+    data version). Numeric columns without nulls are zero-copy views of the mapping.
+    """
+    path = arrow_path(key, data_dir)
+    if not os.path.exists(csv_path(key, data_dir)) and not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        source = pyarrow.memory_map(path, "r")
+    except FileNotFoundError:  # not built yet, or pruned by another process
+        write_arrow(key, data_dir)
+        source = pyarrow.memory_map(path, "r")
+    table = pyarrow.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select(list(columns))
+    return table.to_pandas(split_blocks=True)
+
+@timed("load")
+def read_dataset(key, columns=None, data_dir=None, prefer="parquet"):
+    """
+    Read one dataset with compact dtypes and only `columns` (all when None).
+    prefer == "arrow": the memory-mapped Arrow cache; "parquet": the Parquet copy when
+    available; anything else (or no pyarrow): the CSV.
+    """
+    if prefer == "arrow" and pyarrow is not None:
+        return read_mapped(key, columns, data_dir)
+    if prefer == "parquet" and has_parquet(key, data_dir):
+        return pd.read_parquet(parquet_path(key, data_dir), columns=columns)
+    if not os.path.exists(csv_path(key, data_dir)):
+        return pd.DataFrame()
+    df = read_csv(key, data_dir, usecols=columns)
+    return to_columnar(df, key)
+
+def read_datasets(columns, data_dir=None, workers=4, prefer="parquet"):
+    """
+    Read several datasets concurrently. columns: {dataset key: columns (None for all)}.
+    The Parquet and CSV parsers release the GIL, so a thread pool overlaps the reads.
+    """
+    keys = list(columns)
+    if len(keys) <= 1 or workers <= 1:
+        return {k: read_dataset(k, columns[k], data_dir, prefer) for k in keys}
+    with ThreadPoolExecutor(max_workers=min(workers, len(keys))) as pool:
+        frames = pool.map(lambda k: read_dataset(k, columns[k], data_dir, prefer), keys)
+        return dict(zip(keys, frames))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write typed Parquet copies of the Pulse CSVs.")
+    parser.add_argument("data_dir", nargs="?", default=DATA_DIR)
+    parser.add_argument("--arrow", action="store_true",
+                        help="also write the memory-mapped Arrow cache for the current data version")
+    parser.add_argument("--prune", action="store_true",
+                        help="remove Arrow caches of older data versions (once no dashboard reads them)")
+    args = parser.parse_args(argv)
+    if pyarrow is None:
+        raise SystemExit("pyarrow is required: pip install pyarrow")
+
+    for key in DATASETS:
+        if not os.path.exists(csv_path(key, args.data_dir)):
+            continue
+        df = read_csv(key, args.data_dir)
+        path = write_parquet(key, df, args.data_dir)
+        print(f"{os.path.relpath(path, args.data_dir)}: {len(df)} rows, "
+              f"{os.path.getsize(csv_path(key, args.data_dir)) // 1024} KB csv -> {os.path.getsize(path) // 1024} KB")
+        if args.arrow:
+            write_arrow(key, args.data_dir)
+    if args.prune:
+        for old in prune_arrow(args.data_dir):
+            print(f"removed {os.path.relpath(old, args.data_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Shared fixtures: a synthetic Pulse data tree (benchmarks/synth.py) run through extract -> CSVs -> Parquet."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import storage  # noqa: E402
+import synth  # noqa: E402
+from datasets import DATASETS, read_csv  # noqa: E402
+from pulse_extract import extract_all, write_csvs  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def pulse_tree(tmp_path_factory):
+    """A scale-1 synthetic Pulse JSON tree (read-only; copy it before changing files)."""
+    tree = str(tmp_path_factory.mktemp("pulse") / "tree")
+    synth.generate_tree(tree, scale=1, seed=0)
+    return tree
+
+@pytest.fixture(scope="session")
+def data_dir(pulse_tree, tmp_path_factory):
+    """CSVs and Parquet copies extracted from the synthetic tree."""
+    data = str(tmp_path_factory.mktemp("data"))
+    write_csvs(extract_all(pulse_tree, workers=1), data)
+    for key in DATASETS:
+        storage.write_parquet(key, read_csv(key, data), data)
+    return data
+
+def _sorted(df):
+    df = df.copy()
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(str)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+def assert_same(left, right):
+    pd.testing.assert_frame_equal(_sorted(left), _sorted(right), check_dtype=False, rtol=1e-9)
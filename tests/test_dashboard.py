@@ -0,0 +1,54 @@
+"""Streamlit.py run headless with streamlit.testing (AppTest) on the synthetic data."""
+import os
+
+import pandas as pd
+import pytest
+import requests
+
+import datasets
+import geo
+import snapshots
+from conftest import ROOT
+
+
+class _FakeSnapshot:
+    def covers(self, name, year_from, year_to):
+        return True
+
+    def query(self, name, year_from, year_to, limit=10):
+        return pd.DataFrame({"state": ["Snapshotland"], "total_amount": [1.0]})
+
+def _offline(*args, **kwargs):
+    raise requests.ConnectionError("tests run offline")
+
+def _no_map(*args, **kwargs):
+    raise FileNotFoundError("no map in tests")
+
+def test_dashboard_does_not_cache_snapshot_miss(data_dir, monkeypatch):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    import streamlit as st
+    # the dashboard reads (and caches into) the synthetic data only, with no map and no network
+    monkeypatch.setenv("PULSE_DATA_DIR", data_dir)
+    monkeypatch.setattr(datasets, "DATA_DIR", data_dir)
+    monkeypatch.setenv("PULSE_SNAPSHOTS", "1")
+    monkeypatch.setattr(geo, "load_geojson", _no_map)
+    monkeypatch.setattr(requests, "get", _offline)
+    st.cache_resource.clear()
+    calls = []
+
+    def missing():
+        calls.append(None)
+        return None
+    monkeypatch.setattr(snapshots, "load_snapshot", missing)
+    at = testing.AppTest.from_file(os.path.join(ROOT, "Streamlit.py"), default_timeout=300).run()
+    at.sidebar.radio[0].set_value("Scenario 1: Top States by Transactions (Key1)").run()
+    assert not at.exception
+    assert calls
+
+    # a snapshot built while the dashboard runs is used by the next uncached query
+    monkeypatch.setattr(snapshots, "load_snapshot", lambda: _FakeSnapshot())
+    years = at.sidebar.select_slider[0]
+    years.set_value((years.options[0], years.options[0])).run()
+    assert not at.exception
+    assert "Snapshotland" in at.dataframe[0].value["state"].astype(str).tolist()
+    st.cache_resource.clear()
@@ -0,0 +1,18 @@
+"""Growth, CAGR and rank metrics over entity x quarter matrices (growth.py)."""
+import numpy as np
+
+from growth import GrowthMatrix
+
+
+def test_ranks_skip_missing_values():
+    nan = np.nan
+    growth = GrowthMatrix(["a", "b", "c"], [0, 1, 2], [[5, nan, 1],
+                                                      [4, 2, nan],
+                                                      [nan, 1, 3]])
+    np.testing.assert_array_equal(growth.ranks(), [[1, nan, 2],
+                                                   [2, 1, nan],
+                                                   [nan, 2, 1]])
+    # a missing end gives no rank change, not a jump from the bottom
+    np.testing.assert_array_equal(growth.rank_change(1), [[nan, nan, nan],
+                                                          [nan, 1, nan],
+                                                          [nan, nan, 1]])
@@ -0,0 +1,28 @@
+"""Incremental refresh from the Pulse JSON tree (incremental.py)."""
+import json
+import os
+import shutil
+
+import incremental
+import pulse_extract
+from datasets import read_csv
+
+
+def test_refresh_after_full_extract(pulse_tree, tmp_path):
+    tree, out = str(tmp_path / "tree"), str(tmp_path / "data")
+    shutil.copytree(pulse_tree, tree)
+    pulse_extract.main([tree, "--out", out, "--workers", "1"])
+    assert incremental.refresh(tree, out, workers=1) == {}
+
+    # one changed file replaces only its own partition
+    rel, entry = next((rel, e) for rel, e in incremental.load_manifest(incremental.manifest_path(out))["files"].items()
+                      if e["section"] == "aggregated/transaction")
+    path = os.path.join(tree, rel)
+    with open(path, encoding="utf-8") as f:
+        doc = json.load(f)
+    doc["data"]["transactionData"] = doc["data"]["transactionData"][:1]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    before = read_csv("agg_trans", out)
+    assert incremental.refresh(tree, out, workers=1) == {"agg_trans": 1}
+    assert len(read_csv("agg_trans", out)) == len(before) - entry["rows"]["agg_trans"] + 1
@@ -0,0 +1,36 @@
+"""PostgreSQL loader and backend (db_load.py, backends.PostgresBackend) on a throwaway server.
+
+Skipped unless pgserver (a pip-installable PostgreSQL) is available.
+"""
+import pytest
+
+from backends import QUERIES, get_backend
+from conftest import assert_same
+from datasets import DATASETS, read_csv
+
+
+@pytest.fixture(scope="module")
+def dsn(tmp_path_factory):
+    pgserver = pytest.importorskip("pgserver")
+    pytest.importorskip("sqlalchemy")
+    server = pgserver.get_server(str(tmp_path_factory.mktemp("pg")), cleanup_mode="delete")
+    yield server.get_uri()
+    server.cleanup()
+
+def test_load_version_follows_loads(data_dir, dsn):
+    import db_load
+    backend = get_backend("postgres", dsn=dsn)
+    assert backend.version() is None
+
+    db_load.load_all({key: read_csv(key, data_dir) for key in DATASETS}, dsn)
+    loaded = backend.version()
+    assert loaded
+    for name in QUERIES:
+        assert_same(backend.query(name), get_backend("pandas", data_dir=data_dir).query(name))
+
+    conn = db_load.connect(dsn)
+    try:
+        db_load.stamp_load(conn)
+    finally:
+        conn.close()
+    assert backend.version() not in (None, loaded)
@@ -0,0 +1,41 @@
+"""Parquet and memory-mapped Arrow copies of the datasets (storage.py)."""
+import os
+import time
+
+import pytest
+
+import storage
+from conftest import assert_same
+from datasets import csv_path, read_csv
+
+
+def test_stale_parquet_copy_is_ignored(data_dir, tmp_path):
+    key = "agg_trans"
+    data = str(tmp_path)
+    df = read_csv(key, data_dir)
+    df.to_csv(csv_path(key, data), index=False)
+    storage.write_parquet(key, df, data)
+    assert storage.has_parquet(key, data)
+
+    # the CSV changes after the Parquet copy was written (mtime_ns can repeat on coarse clocks)
+    time.sleep(0.01)
+    df.head(10).to_csv(csv_path(key, data), index=False)
+    assert not storage.has_parquet(key, data)
+    assert len(storage.read_dataset(key, data_dir=data)) == 10
+
+    storage.refresh_parquet(key, df.head(10), data)
+    assert storage.has_parquet(key, data)
+    assert len(storage.read_dataset(key, data_dir=data)) == 10
+
+def test_arrow_cache_survives_prune(data_dir):
+    pytest.importorskip("pyarrow")
+    key = "agg_trans"
+    expected = storage.read_dataset(key, data_dir=data_dir, prefer="arrow")
+    old = os.path.join(os.path.dirname(os.path.dirname(storage.arrow_path(key, data_dir))), "arrow-old")
+    os.makedirs(old, exist_ok=True)
+    # writing never removes other versions; prune does, and a pruned copy is rebuilt on read
+    storage.write_arrow(key, data_dir)
+    assert os.path.isdir(old)
+    assert storage.prune_arrow(data_dir) == [old]
+    os.remove(storage.arrow_path(key, data_dir))
+    assert_same(storage.read_dataset(key, data_dir=data_dir, prefer="arrow"), expected)
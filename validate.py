@@ -0,0 +1,124 @@
+"""Row-cardinality checks for the 12 Pulse datasets.
+
+Two guards against multiplicative blow-ups such as the old nested
+district/pincode loops:
+
+- every entity (district, pincode, brand, ...) appears at most once per
+  (State, Year, Quater) partition;
+- when the source row counts are known (from the extractor), each partition
+  holds exactly that many rows.
+
+It also warns (without failing) about Top_* tables that hold a single row in
+every partition. The notebook's top cells stopped at the first district or
+pincode of each file, so the shipped Top_insurance_District.csv and
+Top_insurance_Pincode.csv look like that. Re-running pulse_extract.py against
+the Pulse repository restores the full top-10 lists.
+
+Usage:
+    python validate.py data          # check the CSVs, exit 1 on failure
+    python validate.py data --fix    # drop duplicated entity rows and rewrite
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from datasets import DATASETS, DATA_DIR, PARTITION_COLS, csv_path, entity_key, read_csv
+from storage import refresh_parquet
+
+
+class RowCardinalityError(ValueError):
+    """Raised when a dataset has more (or fewer) rows per partition than its source."""
+
+
+def duplicate_entities(df, key):
+    """Boolean mask of rows whose entity already appeared in the same partition."""
+    return df.duplicated(entity_key(key), keep='first')
+
+def partition_counts(df):
+    """Rows per (State, Year, Quater) partition."""
+    if df.empty:
+        return pd.Series(dtype='int64')
+    return df.groupby(PARTITION_COLS, sort=False).size()
+
+def check_cardinality(dfs, expected=None):
+    """
+    Validate every dataset in dfs; return a list of problem strings (empty when clean).
+    expected: optional {dataset key: {(state, year, quarter): row count}} from the extractor.
+    """
+    problems = []
+    for key, df in dfs.items():
+        if df is None or df.empty:
+            continue
+        dup = int(duplicate_entities(df, key).sum())
+        if dup:
+            problems.append(f"{key}: {dup} of {len(df)} rows repeat an entity within its partition")
+        if expected and expected.get(key):
+            exp = pd.Series(expected[key], dtype='int64')
+            got = partition_counts(df)
+            exp.index.names = got.index.names = PARTITION_COLS
+            exp, got = (s.astype('int64') for s in exp.align(got, fill_value=0))
+            bad = exp[exp != got]
+            if not bad.empty:
+                state, year, quarter = bad.index[0]
+                problems.append(
+                    f"{key}: {len(bad)} partitions differ from source row counts "
+                    f"(e.g. {state} {year} Q{quarter}: expected {exp[bad.index[0]]}, got {got[bad.index[0]]})"
+                )
+    return problems
+
+def truncated_top_lists(dfs):
+    """Top_* datasets with exactly one row in every partition (top lists cut to their first entry)."""
+    out = []
+    for key, df in dfs.items():
+        if not key.startswith("top_") or df is None or df.empty:
+            continue
+        counts = partition_counts(df)
+        if len(counts) > 1 and (counts == 1).all():
+            out.append(f"{key}: one row in each of {len(counts)} partitions; the top list looks truncated "
+                       f"(re-run pulse_extract.py to restore it)")
+    return out
+
+def validate(dfs, expected=None):
+    """Raise RowCardinalityError if any dataset fails check_cardinality."""
+    problems = check_cardinality(dfs, expected)
+    if problems:
+        raise RowCardinalityError("Row-cardinality check failed:\n  " + "\n  ".join(problems))
+
+def _line_terminator(path):
+    """Keep the existing line endings (the shipped CSVs were written on Windows)."""
+    with open(path, 'rb') as f:
+        return '\r\n' if f.readline().endswith(b'\r\n') else '\n'
+
+def read_csvs(data_dir=None):
+    """Read the CSVs that exist in data_dir with the registry dtypes."""
+    return {key: read_csv(key, data_dir) for key in DATASETS if os.path.exists(csv_path(key, data_dir))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the Pulse CSVs for duplicated rows per partition.")
+    parser.add_argument("data_dir", nargs="?", default=DATA_DIR)
+    parser.add_argument("--fix", action="store_true", help="drop repeated entity rows and rewrite the CSVs")
+    args = parser.parse_args(argv)
+
+    dfs = read_csvs(args.data_dir)
+    problems = check_cardinality(dfs)
+    for p in problems:
+        print(p)
+    for warning in truncated_top_lists(dfs):
+        print(f"warning: {warning}")
+    if problems and args.fix:
+        for key, df in dfs.items():
+            dup = duplicate_entities(df, key)
+            if dup.any():
+                path = csv_path(key, args.data_dir)
+                df[~dup].to_csv(path, index=False, lineterminator=_line_terminator(path))
+                refresh_parquet(key, df[~dup], args.data_dir)
+                print(f"{DATASETS[key]['csv']}: {len(df)} -> {int((~dup).sum())} rows")
+        return 0
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())